@@ -9,11 +9,12 @@ async def setup():
 
 
 async def process_message(sidekick, message, success_criteria, history):
-    results = await sidekick.run_superstep(message, success_criteria, history)
-    return results, sidekick
+    async for results in sidekick.stream_superstep(message, success_criteria, history):
+        yield results, sidekick
 
 
-async def reset():
+async def reset(sidekick):
+    free_resources(sidekick)
     new_sidekick = Sidekick()
     await new_sidekick.setup()
     return "", "", None, new_sidekick
@@ -55,7 +56,7 @@ with gr.Blocks(title="Sidekick", theme=gr.themes.Default(primary_hue="emerald"))
     go_button.click(
         process_message, [sidekick, message, success_criteria, chatbot], [chatbot, sidekick]
     )
-    reset_button.click(reset, [], [message, success_criteria, chatbot, sidekick])
+    reset_button.click(reset, [sidekick], [message, success_criteria, chatbot, sidekick])
 
 
 ui.launch(inbrowser=True)
@@ -0,0 +1,230 @@
+"""
+Concurrency benchmark for the Sidekick graph, with fake chat models in place of the LLMs,
+so it needs no API keys and costs nothing:
+
+    uv run benchmarks.py
+
+Each session runs one superstep (worker, then evaluator) with every model call taking
+LATENCY seconds, many sessions at once on one event loop, as they would under Gradio.
+"""
+
+import asyncio
+import random
+import time
+import uuid
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.memory import MemorySaver
+
+from history import WORKER_HISTORY, HistoryCompactor
+from sidekick import EvaluatorOutput, Sidekick
+
+LATENCY = 0.5
+SESSIONS = (1, 10, 50, 200)
+ANSWER = "The capital of France is Paris, which has been its capital for most of the last thousand years."
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Answers after a fixed delay, sleeping without blocking the event loop when called async.
+    When streamed, the same delay is spread over the answer's words.
+    """
+
+    latency: float = LATENCY
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=ANSWER))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result()
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        words = ANSWER.split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.latency / len(words))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def fake_evaluator(latency: float = LATENCY) -> RunnableLambda:
+    verdict = EvaluatorOutput(feedback="Looks good.", success_criteria_met=True, user_input_needed=False)
+
+    def evaluate(messages: Any) -> EvaluatorOutput:
+        time.sleep(latency)
+        return verdict
+
+    async def aevaluate(messages: Any) -> EvaluatorOutput:
+        await asyncio.sleep(latency)
+        return verdict
+
+    return RunnableLambda(evaluate, afunc=aevaluate)
+
+
+class BlockingSidekick(Sidekick):
+    """
+    The nodes as they were before they went async: plain functions, which LangGraph runs
+    in its thread pool, each holding a thread for the whole of its model call
+    """
+
+    def worker(self, state):
+        return asyncio.run(Sidekick.worker(self, state))
+
+    def evaluator(self, state):
+        return asyncio.run(Sidekick.evaluator(self, state))
+
+
+async def make_sidekick(cls: type[Sidekick]) -> Sidekick:
+    sidekick = cls()
+    sidekick.tools = []
+    sidekick.memory = MemorySaver()
+    sidekick.worker_llm_with_tools = FakeChatModel()
+    sidekick.evaluator_llm_with_output = fake_evaluator()
+    await sidekick.build_graph()
+    return sidekick
+
+
+async def run_sessions(sidekick: Sidekick, sessions: int) -> dict[str, float]:
+    """Run one superstep per session concurrently"""
+    async def session():
+        state = {
+            "messages": [HumanMessage(content="What is the capital of France?")],
+            "success_criteria": "The answer should be clear and accurate",
+            "feedback_on_work": None,
+            "success_criteria_met": False,
+            "user_input_needed": False,
+        }
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        await sidekick.graph.ainvoke(state, config=config)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[session() for _ in range(sessions)])
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "sessions_per_second": sessions / elapsed}
+
+
+async def benchmark_concurrent_sessions(sessions: tuple[int, ...] = SESSIONS) -> dict[str, dict[int, dict[str, float]]]:
+    results = {}
+    for mode, cls in (("sync nodes", BlockingSidekick), ("async nodes", Sidekick)):
+        sidekick = await make_sidekick(cls)
+        results[mode] = {count: await run_sessions(sidekick, count) for count in sessions}
+    return results
+
+
+async def benchmark_time_to_first_token() -> dict[str, float]:
+    """How long the user waits for the first word of the reply, with and without streaming"""
+    sidekick = await make_sidekick(Sidekick)
+    start = time.perf_counter()
+    await sidekick.run_superstep("What is the capital of France?", "", [])
+    blocking = time.perf_counter() - start
+
+    sidekick = await make_sidekick(Sidekick)
+    start = time.perf_counter()
+    first_token = None
+    async for history in sidekick.stream_superstep("What is the capital of France?", "", []):
+        if first_token is None and len(history) > 1:
+            first_token = time.perf_counter() - start
+    return {"run_superstep": blocking, "stream_superstep": first_token, "stream_total": time.perf_counter() - start}
+
+
+async def fake_summarizer(summary, messages) -> str:
+    return (summary or "") + f" {len(messages)} more messages."
+
+
+async def benchmark_history(tasks: int = 100, tool_output_chars: int = 8_000) -> dict[str, float]:
+    """Worker prompt size after a long session of tasks that each call a tool, with and without compaction"""
+    compactor = HistoryCompactor(WORKER_HISTORY, fake_summarizer)
+    messages = []
+    seconds = 0.0
+    for task in range(tasks):
+        call = {"name": "navigate_browser", "args": {"url": f"https://example.com/{task}"}, "id": f"call_{task}"}
+        messages += [
+            HumanMessage(content=f"Task {task}: find out something", id=f"human_{task}"),
+            AIMessage(content="", tool_calls=[call], id=f"call_{task}"),
+            ToolMessage(content="x" * tool_output_chars, tool_call_id=call["id"], id=f"tool_{task}"),
+            AIMessage(content=ANSWER, id=f"answer_{task}"),
+            AIMessage(content="Evaluator Feedback on this answer: Looks good.", id=f"feedback_{task}"),
+        ]
+        start = time.perf_counter()
+        sent = await compactor.compact(messages)
+        seconds += time.perf_counter() - start
+    return {
+        "uncompacted_tokens": sum(HistoryCompactor(WORKER_HISTORY).count(message) for message in messages),
+        "compacted_tokens": sum(HistoryCompactor(WORKER_HISTORY).count(message) for message in sent),
+        "messages_sent": len(sent),
+        "compact_ms": seconds / tasks * 1_000,
+    }
+
+
+async def check_compaction(histories: int = 100, seed: int = 0) -> tuple[int, int]:
+    """
+    Compact randomized sessions at every worker call, and count the prompts that do not start with
+    a user request, which would leave the model an assistant turn whose request was summarized away
+    """
+    rng = random.Random(seed)
+    ids = iter(range(10**9))
+    prompts = problems = 0
+    for _ in range(histories):
+        compactor = HistoryCompactor(WORKER_HISTORY, fake_summarizer)
+        messages = []
+        for task in range(rng.randint(5, 60)):
+            messages.append(HumanMessage(content=f"Task {task}: " + "y" * rng.randint(10, 4_000), id=f"m{next(ids)}"))
+            for _ in range(rng.randint(0, 4)):
+                sent = await compactor.compact(messages)
+                prompts += 1
+                problems += not isinstance(sent[0], HumanMessage)
+                call = {"name": "navigate_browser", "args": {"url": "https://example.com"}, "id": f"m{next(ids)}"}
+                messages += [
+                    AIMessage(content="", tool_calls=[call], id=call["id"]),
+                    ToolMessage(content="x" * rng.randint(100, 30_000), tool_call_id=call["id"], id=f"m{next(ids)}"),
+                ]
+            sent = await compactor.compact(messages)
+            prompts += 1
+            problems += not isinstance(sent[0], HumanMessage)
+            messages += [
+                AIMessage(content=ANSWER * rng.randint(1, 20), id=f"m{next(ids)}"),
+                AIMessage(content="Evaluator Feedback on this answer: Looks good.", id=f"m{next(ids)}"),
+            ]
+    return prompts, problems
+
+
+if __name__ == "__main__":
+    results = asyncio.run(benchmark_concurrent_sessions())
+    print(f"Concurrent Sidekick supersteps, 2 model calls of {LATENCY} s each (ideal: {2 * LATENCY:.1f} s)")
+    for mode, by_sessions in results.items():
+        for count, result in by_sessions.items():
+            print(
+                f"  {mode:<12} {count:>4} sessions: {result['seconds']:>6.2f} s, "
+                f"{result['sessions_per_second']:>6.1f} sessions/s"
+            )
+
+    results = asyncio.run(benchmark_time_to_first_token())
+    print("Time until the first word of the reply reaches the chat")
+    print(f"  run_superstep:    {results['run_superstep']:.2f} s")
+    print(f"  stream_superstep: {results['stream_superstep']:.2f} s (all done after {results['stream_total']:.2f} s)")
+
+    results = asyncio.run(benchmark_history())
+    print(f"Worker prompt after 100 tasks, each with an 8,000 character tool result (budget {WORKER_HISTORY.max_tokens:,} tokens)")
+    print(f"  whole history:  {results['uncompacted_tokens']:>8,} tokens")
+    print(f"  compacted:      {results['compacted_tokens']:>8,} tokens in {results['messages_sent']} messages")
+    print(f"  compaction:     {results['compact_ms']:>8.2f} ms per turn")
+
+    prompts, problems = asyncio.run(check_compaction())
+    print(f"Compacted worker prompts that do not start with a user request: {problems} of {prompts}")
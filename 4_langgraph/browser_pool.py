@@ -0,0 +1,224 @@
+import asyncio
+import inspect
+import os
+
+from dotenv import load_dotenv
+from playwright.async_api import Browser, BrowserContext, Page, Playwright, async_playwright
+
+load_dotenv(override=True)
+
+# Set SIDEKICK_HEADLESS=false to watch the browser work, as the labs do
+HEADLESS = os.getenv("SIDEKICK_HEADLESS", "true").lower() != "false"
+MAX_BROWSER_SESSIONS = int(os.getenv("SIDEKICK_MAX_BROWSER_SESSIONS", "20"))
+PAGES_PER_SESSION = int(os.getenv("SIDEKICK_PAGES_PER_SESSION", "3"))
+SPARE_CONTEXTS = 2
+
+
+class SessionBrowser(Browser):
+    """
+    The shared browser as seen by one session's tools. The PlayWright toolkit always works
+    in browser.contexts[0], creating it with new_context() if there is none, so this shows it
+    only the session's own context. It subclasses Browser because the toolkit's tools check
+    for one, but it doesn't wrap Playwright's internals: it answers the calls the toolkit
+    makes, and a few more, from the public API of the shared browser and the context.
+    The rest of the Browser interface raises NotImplementedError instead of failing inside
+    Playwright. Check it against real Chromium with `uv run browser_pool.py` after upgrading Playwright.
+    """
+
+    def __init__(self, browser: Browser, context: BrowserContext):
+        # Browser.__init__ is deliberately not called; nothing here goes through Playwright's impl object
+        self._browser = browser
+        self._session_context = context
+
+    def __repr__(self) -> str:
+        return f"<SessionBrowser of {self._browser!r}>"
+
+    __str__ = __repr__
+
+    @property
+    def contexts(self) -> list[BrowserContext]:
+        return [self._session_context]
+
+    @property
+    def version(self) -> str:
+        return self._browser.version
+
+    def is_connected(self) -> bool:
+        return self._browser.is_connected()
+
+    async def new_context(self, **kwargs) -> BrowserContext:
+        return self._session_context
+
+    async def new_page(self, **kwargs) -> Page:
+        return await self._session_context.new_page()
+
+    async def close(self, **kwargs) -> None:
+        # The browser is shared; the session's context is closed when the session is released
+        pass
+
+
+def _unsupported(name: str, attribute):
+    def unsupported(self, *args, **kwargs):
+        raise NotImplementedError(f"SessionBrowser does not support Browser.{name}, only what the PlayWright toolkit uses")
+
+    return property(unsupported) if isinstance(attribute, property) else unsupported
+
+
+# Everything else Browser offers would need Playwright's impl object, which SessionBrowser doesn't have
+for _name in dir(Browser):
+    if not _name.startswith("_") and _name not in vars(SessionBrowser):
+        setattr(SessionBrowser, _name, _unsupported(_name, inspect.getattr_static(Browser, _name)))
+
+
+class BrowserSession:
+    """One Sidekick's isolated context in the shared browser, keeping at most PAGES_PER_SESSION pages open"""
+
+    def __init__(self, pool: "BrowserPool", context: BrowserContext):
+        self.pool = pool
+        self.context = context
+        self.browser = SessionBrowser(pool.browser, context)
+        self.closed = False
+        context.on("page", self._limit_pages)
+
+    def _limit_pages(self, page: Page) -> None:
+        # The tools act on the newest page, so the oldest ones are closed to make room
+        for old in self.context.pages[: -self.pool.pages_per_session]:
+            asyncio.ensure_future(old.close())
+
+    async def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            await self.pool.release(self)
+
+    def release(self) -> None:
+        """close() from any thread, e.g. a Gradio delete callback"""
+        asyncio.run_coroutine_threadsafe(self.close(), self.pool.loop)
+
+
+class BrowserPool:
+    """
+    One Chromium process shared by every Sidekick in this process. Each session gets a
+    BrowserContext of its own, so cookies, storage and pages are never shared, and at most
+    max_sessions are open at once; later sessions wait for a slot. Contexts are not reused
+    between sessions: a released one is closed, and a few fresh spares are kept ready so
+    that a new session doesn't wait for one to be created.
+    """
+
+    def __init__(
+        self,
+        headless: bool = HEADLESS,
+        max_sessions: int = MAX_BROWSER_SESSIONS,
+        pages_per_session: int = PAGES_PER_SESSION,
+        spare_contexts: int = SPARE_CONTEXTS,
+    ):
+        self.headless = headless
+        self.max_sessions = max_sessions
+        self.pages_per_session = pages_per_session
+        self.spare_contexts = spare_contexts
+        self.playwright: Playwright | None = None
+        self.browser: Browser | None = None
+        self.loop = None
+        self.lock = None
+        self.slots = None
+        self.spares: list[BrowserContext] = []
+        self.sessions: set[BrowserSession] = set()
+        self.refilling = None
+
+    async def _ensure_browser(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # Playwright objects can't be shared between event loops
+            self.loop, self.lock, self.slots = loop, asyncio.Lock(), asyncio.Semaphore(self.max_sessions)
+            self.playwright, self.browser, self.spares, self.sessions = None, None, [], set()
+        async with self.lock:
+            if self.browser is None or not self.browser.is_connected():
+                if self.playwright is None:
+                    self.playwright = await async_playwright().start()
+                self.browser = await self.playwright.chromium.launch(headless=self.headless)
+                self.spares = []
+
+    async def acquire(self) -> BrowserSession:
+        await self._ensure_browser()
+        await self.slots.acquire()
+        try:
+            context = self.spares.pop() if self.spares else await self.browser.new_context()
+        except BaseException:
+            self.slots.release()
+            raise
+        session = BrowserSession(self, context)
+        self.sessions.add(session)
+        if self.refilling is None or self.refilling.done():
+            self.refilling = asyncio.create_task(self._refill())
+        return session
+
+    async def _refill(self) -> None:
+        while len(self.spares) < self.spare_contexts and self.browser and self.browser.is_connected():
+            self.spares.append(await self.browser.new_context())
+
+    async def release(self, session: BrowserSession) -> None:
+        if session not in self.sessions:
+            return
+        self.sessions.discard(session)
+        self.slots.release()
+        try:
+            await session.context.close()
+        except Exception as e:
+            print(f"Could not close a browser context: {e}")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "sessions": len(self.sessions),
+            "spare_contexts": len(self.spares),
+            "pages": sum(len(session.context.pages) for session in self.sessions),
+        }
+
+    async def close(self) -> None:
+        for session in list(self.sessions):
+            await session.close()
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
+        self.spares = []
+
+
+pool = BrowserPool()
+
+
+async def check_with_chromium() -> list[str]:
+    """
+    Run the PlayWright toolkit in two sessions of a real headless Chromium and return any
+    problems: each session's tools must work in its own context and never see the other's pages
+    """
+    from langchain_community.agent_toolkits import PlayWrightBrowserToolkit
+
+    check_pool = BrowserPool(headless=True, max_sessions=2, spare_contexts=0)
+    problems = []
+    try:
+        sessions = [await check_pool.acquire() for _ in range(2)]
+        for i, session in enumerate(sessions):
+            tools = {tool.name: tool for tool in PlayWrightBrowserToolkit.from_browser(async_browser=session.browser).get_tools()}
+            await tools["navigate_browser"].arun({"url": f"data:text/html,<p>session {i}</p>"})
+            text = await tools["extract_text"].arun({})
+            if f"session {i}" not in text:
+                problems.append(f"session {i} extracted {text!r}")
+        for i, session in enumerate(sessions):
+            if len(session.context.pages) != 1:
+                problems.append(f"session {i} has {len(session.context.pages)} pages, expected 1")
+        if len(check_pool.browser.contexts) != 2:
+            problems.append(f"the browser has {len(check_pool.browser.contexts)} contexts, expected 2")
+    except Exception as e:
+        problems.append(f"{type(e).__name__}: {e}")
+    finally:
+        await check_pool.close()
+    return problems
+
+
+if __name__ == "__main__":
+    from importlib.metadata import version
+
+    problems = asyncio.run(check_with_chromium())
+    print(f"Playwright {version('playwright')}: " + ("; ".join(problems) if problems else "browser sessions work"))
+    raise SystemExit(1 if problems else 0)
@@ -0,0 +1,195 @@
+import asyncio
+import os
+import time
+import zlib
+from typing import Any
+
+import aiosqlite
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+load_dotenv(override=True)
+
+# Kept apart from memory.db, where the labs save their own conversations
+CHECKPOINT_DB = os.getenv("SIDEKICK_CHECKPOINT_DB", "sidekick.db")
+CHECKPOINTS_PER_THREAD = int(os.getenv("SIDEKICK_CHECKPOINTS_PER_THREAD", "10"))
+# Threads nobody has written to for this long are deleted as abandoned
+CHECKPOINT_MAX_AGE_HOURS = float(os.getenv("SIDEKICK_CHECKPOINT_MAX_AGE_HOURS", "24"))
+SWEEP_EVERY_SECONDS = 600
+COMPRESS_OVER_BYTES = 2048
+COMPRESSED_SUFFIX = "+zlib"
+
+
+class CompressingSerializer(SerializerProtocol):
+    """
+    Serializes like the default JsonPlusSerializer, but zlib-compresses payloads larger
+    than min_size; the type tag records which ones, so older rows still load.
+    """
+
+    def __init__(self, serde: SerializerProtocol | None = None, min_size: int = COMPRESS_OVER_BYTES, level: int = 6):
+        self.serde = serde or JsonPlusSerializer()
+        self.min_size = min_size
+        self.level = level
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        if len(data) > self.min_size:
+            return type_ + COMPRESSED_SUFFIX, zlib.compress(data, self.level)
+        return type_, data
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(COMPRESSED_SUFFIX):
+            type_, payload = type_.removesuffix(COMPRESSED_SUFFIX), zlib.decompress(payload)
+        return self.serde.loads_typed((type_, payload))
+
+
+class PruningSqliteSaver(AsyncSqliteSaver):
+    """
+    An AsyncSqliteSaver that keeps only the newest keep_last checkpoints of each thread,
+    with their pending writes, so a long-running conversation stops growing the database.
+    Every checkpoint holds the full channel values, so the latest one never depends on the
+    pruned ones; only time travel further back than keep_last steps is lost.
+    The last write to each thread is recorded, and threads left untouched for max_age_hours
+    are deleted when the saver connects and every SWEEP_EVERY_SECONDS after, so sessions
+    that ended without deleting their thread don't stay on disk forever. Threads it has never
+    written to are left alone.
+    """
+
+    def __init__(
+        self,
+        conn: aiosqlite.Connection,
+        keep_last: int = CHECKPOINTS_PER_THREAD,
+        max_age_hours: float = CHECKPOINT_MAX_AGE_HOURS,
+        serde: SerializerProtocol | None = None,
+    ):
+        super().__init__(conn, serde=serde or CompressingSerializer())
+        self.keep_last = keep_last
+        self.max_age = max_age_hours * 3600
+        self.next_sweep = time.monotonic() + SWEEP_EVERY_SECONDS
+        self.activity_setup = False
+
+    @classmethod
+    async def connect(
+        cls, path: str = CHECKPOINT_DB, keep_last: int = CHECKPOINTS_PER_THREAD, max_age_hours: float = CHECKPOINT_MAX_AGE_HOURS
+    ) -> "PruningSqliteSaver":
+        """Open the database, make sure the tables exist and sweep abandoned threads; close it again with close()"""
+        conn = await aiosqlite.connect(path)
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        saver = cls(conn, keep_last=keep_last, max_age_hours=max_age_hours)
+        await saver.setup()
+        await saver.sweep()
+        return saver
+
+    async def setup(self) -> None:
+        await super().setup()
+        if self.activity_setup:
+            return
+        async with self.lock:
+            # Only threads this saver writes are recorded, so other savers' threads in the same file are never swept
+            await self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_activity (thread_id TEXT PRIMARY KEY, updated REAL NOT NULL)"
+            )
+            await self.conn.commit()
+            self.activity_setup = True
+
+    async def close(self) -> None:
+        await self.conn.close()
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        saved = await super().aput(config, checkpoint, metadata, new_versions)
+        await self.prune(saved["configurable"]["thread_id"], saved["configurable"]["checkpoint_ns"])
+        if time.monotonic() >= self.next_sweep:
+            await self.sweep()
+        return saved
+
+    async def prune(self, thread_id: str, checkpoint_ns: str = "") -> None:
+        """
+        Delete all but the newest keep_last checkpoints of the thread, and record that it was
+        written to; checkpoint ids sort by time
+        """
+        key = (str(thread_id), checkpoint_ns)
+        async with self.lock, self.conn.cursor() as cur:
+            await cur.execute(
+                """
+                INSERT INTO thread_activity (thread_id, updated) VALUES (?, ?)
+                ON CONFLICT(thread_id) DO UPDATE SET updated = excluded.updated
+                """,
+                (str(thread_id), time.time()),
+            )
+            await cur.execute(
+                """
+                SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?
+                """,
+                (*key, self.keep_last - 1),
+            )
+            row = await cur.fetchone()
+            if row is not None:
+                for table in ("checkpoints", "writes"):
+                    await cur.execute(
+                        f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                        (*key, row[0]),
+                    )
+            await self.conn.commit()
+
+    async def sweep(self) -> int:
+        """Delete every thread that hasn't been written to for max_age; return how many were deleted"""
+        self.next_sweep = time.monotonic() + SWEEP_EVERY_SECONDS
+        async with self.lock, self.conn.cursor() as cur:
+            await cur.execute("SELECT thread_id FROM thread_activity WHERE updated < ?", (time.time() - self.max_age,))
+            threads = [(row[0],) for row in await cur.fetchall()]
+            for table in ("checkpoints", "writes", "thread_activity"):
+                await cur.executemany(f"DELETE FROM {table} WHERE thread_id = ?", threads)
+            await self.conn.commit()
+        return len(threads)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await super().adelete_thread(thread_id)
+        async with self.lock:
+            await self.conn.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+            await self.conn.commit()
+
+    def forget(self, thread_id: str) -> None:
+        """Delete a thread from any thread, e.g. a Gradio delete callback, without waiting for it"""
+        asyncio.run_coroutine_threadsafe(self.adelete_thread(thread_id), self.loop)
+
+
+class SharedSaver:
+    """
+    One PruningSqliteSaver, on one connection, shared by every Sidekick in this process and
+    opened on first use. Each Sidekick keeps to its own thread, so they never see each other's state.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_DB):
+        self.path = path
+        self.saver: PruningSqliteSaver | None = None
+        self.loop = None
+        self.lock = None
+
+    async def get(self) -> PruningSqliteSaver:
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # aiosqlite connections can't be shared between event loops
+            self.loop, self.lock, self.saver = loop, asyncio.Lock(), None
+        async with self.lock:
+            if self.saver is None:
+                self.saver = await PruningSqliteSaver.connect(self.path)
+            return self.saver
+
+    async def close(self) -> None:
+        if self.saver and self.loop is asyncio.get_running_loop():
+            await self.saver.close()
+            self.saver = None
+
+
+checkpoints = SharedSaver()
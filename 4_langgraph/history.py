@@ -0,0 +1,173 @@
+import json
+import os
+from typing import Awaitable, Callable, List
+
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.constants import TAG_NOSTREAM
+from pydantic import BaseModel, Field
+
+load_dotenv(override=True)
+
+# A rough count that is close enough for budgeting, and needs no tokenizer or API call
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+WORKER_MAX_TOKENS = int(os.getenv("SIDEKICK_WORKER_MAX_TOKENS", "12000"))
+EVALUATOR_MAX_TOKENS = int(os.getenv("SIDEKICK_EVALUATOR_MAX_TOKENS", "6000"))
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an assistant that uses tools.
+Update the summary with the new messages. Keep the user's requests, decisions, facts that were found and files that were written;
+leave out pleasantries and raw tool output. Reply with the updated summary only."""
+
+Summarizer = Callable[[str | None, List[BaseMessage]], Awaitable[str]]
+
+
+class HistoryBudget(BaseModel):
+    """How much of the conversation one node sends to its model"""
+
+    max_tokens: int = Field(description="Compact the history once it would exceed this many tokens")
+    target_tokens: int = Field(description="When compacting, drop old turns until the history is this small")
+    keep_last_messages: int = Field(default=6, description="The most recent messages are always sent in full")
+    tool_output_tokens: int = Field(default=250, description="Older tool results are cut to this many tokens")
+    summarize: bool = Field(default=True, description="Replace dropped turns with a running summary")
+
+
+WORKER_HISTORY = HistoryBudget(max_tokens=WORKER_MAX_TOKENS, target_tokens=WORKER_MAX_TOKENS * 2 // 3)
+EVALUATOR_HISTORY = HistoryBudget(
+    max_tokens=EVALUATOR_MAX_TOKENS, target_tokens=EVALUATOR_MAX_TOKENS * 2 // 3, summarize=False
+)
+
+
+def message_text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else json.dumps(message.content, default=str)
+
+
+def model_text(message: BaseMessage) -> str:
+    """What a node sends to its model for a message: the content, and any tool calls with their arguments"""
+    text = message_text(message)
+    for call in getattr(message, "tool_calls", None) or []:
+        text += call["name"] + json.dumps(call["args"], default=str)
+    return text
+
+
+class HistoryCompactor:
+    """
+    Keeps the messages one node sends to its model within a HistoryBudget, for one conversation.
+    Older tool results are cut short, and once the total goes over max_tokens, the oldest turns
+    are dropped down to target_tokens, and optionally folded into a running summary. Only whole
+    turns are dropped, from one user request up to the next, so what is sent always starts with
+    a user request, and the turns of the current request are never dropped; if the current
+    request alone is still over max_tokens, its tool results are cut short too, oldest first,
+    all but the latest. Token counts are cached per message id, and dropped messages are never
+    looked at again, so each call only counts what is new. Only what is sent is compacted; the
+    graph state keeps every message.
+
+    render gives the text the node actually sends for a message, or "" for one it leaves out,
+    so that each node counts only what is in its own prompt.
+    """
+
+    def __init__(
+        self,
+        budget: HistoryBudget,
+        summarizer: Summarizer | None = None,
+        render: Callable[[BaseMessage], str] = model_text,
+    ):
+        self.budget = budget
+        self.summarizer = summarizer
+        self.render = render
+        self.start = 0
+        self.dropped = 0
+        self.summary = None
+        self.tokens: dict[str, int] = {}
+
+    def count(self, message: BaseMessage) -> int:
+        tokens = self.tokens.get(message.id) if message.id else None
+        if tokens is None:
+            text = self.render(message)
+            tokens = len(text) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS if text else 0
+            if message.id:
+                self.tokens[message.id] = tokens
+        return tokens
+
+    def shortened_cost(self, message: BaseMessage) -> int:
+        if isinstance(message, ToolMessage):
+            return min(self.count(message), self.budget.tool_output_tokens + MESSAGE_OVERHEAD_TOKENS)
+        return self.count(message)
+
+    def shorten(self, message: BaseMessage) -> BaseMessage:
+        if not isinstance(message, ToolMessage) or self.count(message) <= self.budget.tool_output_tokens + MESSAGE_OVERHEAD_TOKENS:
+            return message
+        text = message_text(message)
+        keep = self.budget.tool_output_tokens * CHARS_PER_TOKEN
+        return message.model_copy(
+            update={"content": f"{text[:keep]}\n[{len(text) - keep} more characters of tool output left out]"}
+        )
+
+    async def compact(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        if self.start > len(messages):
+            self.start = self.dropped = 0
+            self.summary = None
+        kept = messages[self.start:]
+        old = len(kept) - self.budget.keep_last_messages
+        costs = [self.shortened_cost(message) if i < old else self.count(message) for i, message in enumerate(kept)]
+        total = sum(costs)
+        if total > self.budget.max_tokens:
+            current = max((i for i, message in enumerate(kept) if isinstance(message, HumanMessage)), default=0)
+            drop = 0
+            while drop < current and total > self.budget.target_tokens:
+                total -= costs[drop]
+                drop += 1
+            # Finish the turn: the kept messages start with the user's next request
+            while drop < current and not isinstance(kept[drop], HumanMessage):
+                total -= costs[drop]
+                drop += 1
+            if drop:
+                if self.summarizer and self.budget.summarize:
+                    try:
+                        self.summary = await self.summarizer(
+                            self.summary, [self.shorten(message) for message in kept[:drop]]
+                        )
+                    except Exception as e:
+                        print(f"Could not summarize the dropped messages: {e}")
+                self.start += drop
+                self.dropped += drop
+                kept = kept[drop:]
+                costs = costs[drop:]
+                old -= drop
+        if total > self.budget.max_tokens:
+            # The current request alone is over budget: cut its recent tool results as well, keeping the latest whole
+            recent = [i for i, message in enumerate(kept) if i >= old and isinstance(message, ToolMessage)]
+            for i in recent[:-1]:
+                if total <= self.budget.max_tokens:
+                    break
+                total -= costs[i] - self.shortened_cost(kept[i])
+                old = max(old, i + 1)
+        return [self.shorten(message) if i < old else message for i, message in enumerate(kept)]
+
+    def note(self) -> str:
+        """A line for the system prompt saying what was left out, with the summary if there is one"""
+        if not self.dropped:
+            return ""
+        note = f"The {self.dropped} earliest messages of this conversation have been left out to save space."
+        if self.summary:
+            note += f" This is a summary of them:\n{self.summary}"
+        return note
+
+
+def llm_summarizer(llm) -> Summarizer:
+    """
+    A Summarizer that asks the given chat model to fold new messages into the running summary.
+    It runs inside the worker node, so its run is tagged to keep its tokens out of the node's
+    message stream, where they would show up in the chat as the assistant's reply.
+    """
+
+    llm = llm.with_config(tags=[TAG_NOSTREAM])
+
+    async def summarize(summary: str | None, messages: List[BaseMessage]) -> str:
+        transcript = "\n".join(f"{message.type}: {message_text(message)}" for message in messages)
+        request = f"Summary so far:\n{summary}\n\n" if summary else ""
+        request += f"New messages:\n{transcript}"
+        response = await llm.ainvoke([SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=request)])
+        return message_text(response)
+
+    return summarize
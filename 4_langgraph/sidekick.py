@@ -10,8 +10,11 @@ from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from typing import List, Any, Optional, Dict
 from pydantic import BaseModel, Field
 from sidekick_tools import playwright_tools, other_tools
+from checkpointer import CHECKPOINT_DB, PruningSqliteSaver, checkpoints
+from history import EVALUATOR_HISTORY, WORKER_HISTORY, HistoryBudget, HistoryCompactor, llm_summarizer
 import uuid
 import asyncio
+import json
 from datetime import datetime
 
 from langchain_groq import ChatGroq
@@ -20,6 +23,8 @@ import os
 
 load_dotenv(override=True)
 
+TOOL_OUTPUT_PREVIEW_CHARS = 500
+
 
 class State(TypedDict):
     messages: Annotated[List[Any], add_messages]
@@ -37,21 +42,35 @@ class EvaluatorOutput(BaseModel):
     )
 
 
+def conversation_line(message: Any) -> str:
+    """How a message appears in the transcript the evaluator is shown; tool results are left out"""
+    if isinstance(message, HumanMessage):
+        return f"User: {message.content}\n"
+    elif isinstance(message, AIMessage):
+        text = message.content or "[Tools use]"
+        return f"Assistant: {text}\n"
+    return ""
+
+
 class Sidekick:
-    def __init__(self):
+    def __init__(self, worker_history: HistoryBudget = WORKER_HISTORY, evaluator_history: HistoryBudget = EVALUATOR_HISTORY):
         self.worker_llm_with_tools = None
         self.evaluator_llm_with_output = None
         self.tools = None
         self.llm_with_tools = None
         self.graph = None
         self.sidekick_id = str(uuid.uuid4())
-        self.memory = MemorySaver()
-        self.browser = None
-        self.playwright = None
+        self.memory = None
+        self.browser_session = None
+        # What each node sends of the conversation, kept within its own token budget
+        self.worker_history = HistoryCompactor(worker_history)
+        self.evaluator_history = HistoryCompactor(evaluator_history, render=conversation_line)
 
     async def setup(self):
-        self.tools, self.browser, self.playwright = await playwright_tools()
+        self.tools, self.browser_session = await playwright_tools()
         self.tools += await other_tools()
+        # Set SIDEKICK_CHECKPOINT_DB to an empty string to keep checkpoints in memory instead
+        self.memory = await checkpoints.get() if CHECKPOINT_DB else MemorySaver()
         # worker_llm = ChatOpenAI(model="gpt-4o-mini")
         # self.worker_llm_with_tools = worker_llm.bind_tools(self.tools)
 
@@ -62,6 +81,7 @@ class Sidekick:
             temperature=0
         )
         self.worker_llm_with_tools = worker_llm.bind_tools(self.tools)
+        self.worker_history.summarizer = llm_summarizer(worker_llm)
 
         # evaluator_llm = ChatOpenAI(model="gpt-4o-mini")
         # self.evaluator_llm_with_output = evaluator_llm.with_structured_output(EvaluatorOutput)
@@ -76,7 +96,7 @@ class Sidekick:
 
         await self.build_graph()
 
-    def worker(self, state: State) -> Dict[str, Any]:
+    async def worker(self, state: State) -> Dict[str, Any]:
         system_message = f"""You are a helpful assistant that can use tools to complete tasks.
     You keep working on a task until either you have a question or clarification for the user, or the success criteria is met.
     You have many tools to help you, including tools to browse the internet, navigating and retrieving web pages.
@@ -105,10 +125,14 @@ class Sidekick:
     {state["feedback_on_work"]}
     With this feedback, please continue the assignment, ensuring that you meet the success criteria or have a question for the user."""
 
+        # Keep what is sent within the worker's token budget
+        messages = await self.worker_history.compact(state["messages"])
+        if self.worker_history.note():
+            system_message += f"\n    {self.worker_history.note()}"
+
         # Add in the system message
 
         found_system_message = False
-        messages = state["messages"]
         for message in messages:
             if isinstance(message, SystemMessage):
                 message.content = system_message
@@ -118,7 +142,7 @@ class Sidekick:
             messages = [SystemMessage(content=system_message)] + messages
 
         # Invoke the LLM with tools
-        response = self.worker_llm_with_tools.invoke(messages)
+        response = await self.worker_llm_with_tools.ainvoke(messages)
 
         # Return updated state
         return {
@@ -136,24 +160,24 @@ class Sidekick:
     def format_conversation(self, messages: List[Any]) -> str:
         conversation = "Conversation history:\n\n"
         for message in messages:
-            if isinstance(message, HumanMessage):
-                conversation += f"User: {message.content}\n"
-            elif isinstance(message, AIMessage):
-                text = message.content or "[Tools use]"
-                conversation += f"Assistant: {text}\n"
+            conversation += conversation_line(message)
         return conversation
 
-    def evaluator(self, state: State) -> State:
+    async def evaluator(self, state: State) -> State:
         last_response = state["messages"][-1].content
 
         system_message = """You are an evaluator that determines if a task has been completed successfully by an Assistant.
     Assess the Assistant's last response based on the given criteria. Respond with your feedback, and with your decision on whether the success criteria has been met,
     and whether more input is needed from the user."""
 
+        conversation = self.format_conversation(await self.evaluator_history.compact(state["messages"]))
+        if self.evaluator_history.note():
+            conversation = f"({self.evaluator_history.note()})\n" + conversation
+
         user_message = f"""You are evaluating a conversation between the User and Assistant. You decide what action to take based on the last response from the Assistant.
 
     The entire conversation with the assistant, with the user's original request and all replies, is:
-    {self.format_conversation(state["messages"])}
+    {conversation}
 
     The success criteria for this assignment is:
     {state["success_criteria"]}
@@ -177,7 +201,7 @@ class Sidekick:
             HumanMessage(content=user_message),
         ]
 
-        eval_result = self.evaluator_llm_with_output.invoke(evaluator_messages)
+        eval_result = await self.evaluator_llm_with_output.ainvoke(evaluator_messages)
         new_state = {
             "messages": [
                 {
@@ -219,31 +243,82 @@ class Sidekick:
         # Compile the graph
         self.graph = graph_builder.compile(checkpointer=self.memory)
 
-    async def run_superstep(self, message, success_criteria, history):
-        config = {"configurable": {"thread_id": self.sidekick_id}}
-
-        state = {
+    def initial_state(self, message, success_criteria) -> State:
+        return {
             "messages": message,
             "success_criteria": success_criteria or "The answer should be clear and accurate",
             "feedback_on_work": None,
             "success_criteria_met": False,
             "user_input_needed": False,
         }
+
+    async def run_superstep(self, message, success_criteria, history):
+        config = {"configurable": {"thread_id": self.sidekick_id}}
+
+        state = self.initial_state(message, success_criteria)
         result = await self.graph.ainvoke(state, config=config)
         user = {"role": "user", "content": message}
         reply = {"role": "assistant", "content": result["messages"][-2].content}
         feedback = {"role": "assistant", "content": result["messages"][-1].content}
         return history + [user, reply, feedback]
 
+    async def stream_superstep(self, message, success_criteria, history):
+        """
+        Like run_superstep, but yields the chat history again every time something happens:
+        each token of the worker's replies, each tool call as it starts and finishes, and the
+        evaluator's verdict. Tool calls are shown as collapsible messages with a title.
+        """
+        config = {"configurable": {"thread_id": self.sidekick_id}}
+        state = self.initial_state(message, success_criteria)
+        history = history + [{"role": "user", "content": message}]
+        yield history
+
+        reply = None  # the message the current worker turn is streaming into
+        tool_calls = {}
+        async for mode, chunk in self.graph.astream(state, config=config, stream_mode=["messages", "updates"]):
+            if mode == "messages":
+                token, metadata = chunk
+                if metadata.get("langgraph_node") != "worker" or not isinstance(token.content, str) or not token.content:
+                    continue
+                if reply is None:
+                    reply = {"role": "assistant", "content": ""}
+                    history = history + [reply]
+                reply["content"] += token.content
+            else:
+                for node, update in chunk.items():
+                    if node == "worker":
+                        response = update["messages"][-1]
+                        if reply is not None and isinstance(response.content, str):
+                            reply["content"] = response.content
+                        elif reply is None and not response.tool_calls:
+                            history = history + [{"role": "assistant", "content": response.content}]
+                        reply = None
+                        for call in response.tool_calls:
+                            entry = {
+                                "role": "assistant",
+                                "content": f"{call['name']}({json.dumps(call['args'])})",
+                                "metadata": {"title": f"🛠️ Using {call['name']}", "status": "pending"},
+                            }
+                            tool_calls[call["id"]] = (call["name"], entry)
+                            history = history + [entry]
+                    elif node == "tools":
+                        for result in update["messages"]:
+                            if result.tool_call_id not in tool_calls:
+                                continue
+                            name, entry = tool_calls.pop(result.tool_call_id)
+                            output = str(result.content)
+                            if len(output) > TOOL_OUTPUT_PREVIEW_CHARS:
+                                output = output[:TOOL_OUTPUT_PREVIEW_CHARS] + "…"
+                            entry["content"] += f"\n\n{output}"
+                            entry["metadata"] = {"title": f"🛠️ Used {name}", "status": "done"}
+                    elif node == "evaluator":
+                        history = history + [{"role": "assistant", "content": update["messages"][-1]["content"]}]
+            yield history
+
     def cleanup(self):
-        if self.browser:
-            try:
-                loop = asyncio.get_running_loop()
-                loop.create_task(self.browser.close())
-                if self.playwright:
-                    loop.create_task(self.playwright.stop())
-            except RuntimeError:
-                # If no loop is running, do a direct run
-                asyncio.run(self.browser.close())
-                if self.playwright:
-                    asyncio.run(self.playwright.stop())
+        if self.browser_session:
+            self.browser_session.release()
+            self.browser_session = None
+        if isinstance(self.memory, PruningSqliteSaver):
+            # The saver is shared; only this session's thread goes, and a new Sidekick starts a new one
+            self.memory.forget(self.sidekick_id)
@@ -1,4 +1,4 @@
-from playwright.async_api import async_playwright
+from browser_pool import BrowserSession, pool
 from langchain_community.agent_toolkits import PlayWrightBrowserToolkit
 from dotenv import load_dotenv
 import os
@@ -18,11 +18,11 @@ pushover_user = os.getenv("PUSHOVER_USER")
 pushover_url = "https://api.pushover.net/1/messages.json"
 serper = GoogleSerperAPIWrapper()
 
-async def playwright_tools():
-    playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False)
-    toolkit = PlayWrightBrowserToolkit.from_browser(async_browser=browser)
-    return toolkit.get_tools(), browser, playwright
+async def playwright_tools() -> tuple[list, BrowserSession]:
+    """Browser tools working in a context of their own in the shared browser; release the session when done"""
+    session = await pool.acquire()
+    toolkit = PlayWrightBrowserToolkit.from_browser(async_browser=session.browser)
+    return toolkit.get_tools(), session
 
 
 def push(text: str):
@@ -1,15 +1,34 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
+import asyncio
 import json
+import math
+from contextlib import contextmanager
+from typing import Callable, TypeVar
 from dotenv import load_dotenv
 from datetime import datetime
-from market import get_share_price
-from database import write_account, read_account, write_log
+from market import get_share_price, get_share_prices, get_share_prices_async
+from database import (
+    TRANSACTION_WINDOW,
+    read_account,
+    read_holdings,
+    read_transactions,
+    transaction,
+    update_account,
+    write_account,
+    write_accounts,
+    write_log,
+)
 
 load_dotenv(override=True)
 
 INITIAL_BALANCE = 10_000.0
 SPREAD = 0.002
 
+T = TypeVar("T")
+# Timestamps for transactions and portfolio values; backtest.py replaces this with its simulated clock
+clock: Callable[[], datetime] = datetime.now
+_account_locks: dict[str, asyncio.Lock] = {}
+
 
 class Transaction(BaseModel):
     symbol: str
@@ -25,13 +44,45 @@ class Transaction(BaseModel):
         return f"{abs(self.quantity)} shares of {self.symbol} at {self.price} each."
 
 
+def aggregates_from_transactions(transactions: list[Transaction]) -> tuple[dict[str, float], float, float]:
+    """
+    Replay the transaction history to compute the running aggregates from scratch.
+    Returns (cost_basis per symbol, realized profit/loss, total invested)
+    """
+    holdings: dict[str, int] = {}
+    cost_basis: dict[str, float] = {}
+    realized_pnl = 0.0
+    total_invested = 0.0
+    for transaction in transactions:
+        symbol, quantity = transaction.symbol, transaction.quantity
+        total_invested += transaction.total()
+        if quantity > 0:
+            cost_basis[symbol] = cost_basis.get(symbol, 0.0) + transaction.total()
+        else:
+            sold_cost = cost_basis[symbol] * -quantity / holdings[symbol]
+            realized_pnl += -transaction.total() - sold_cost
+            cost_basis[symbol] -= sold_cost
+        holdings[symbol] = holdings.get(symbol, 0) + quantity
+        if holdings[symbol] == 0:
+            del holdings[symbol]
+            del cost_basis[symbol]
+    return cost_basis, realized_pnl, total_invested
+
+
 class Account(BaseModel):
     name: str
     balance: float
     strategy: str
     holdings: dict[str, int]
+    # Only the most recent transactions and portfolio values; list_transactions() reads the full history
     transactions: list[Transaction]
     portfolio_value_time_series: list[tuple[str, float]]
+    cost_basis: dict[str, float] = {}
+    realized_pnl: float = 0.0
+    total_invested: float = 0.0
+    # How many of the transactions and portfolio values above are already stored
+    _saved_transactions: int = PrivateAttr(0)
+    _saved_values: int = PrivateAttr(0)
 
     @classmethod
     def get(cls, name: str):
@@ -43,14 +94,54 @@ class Account(BaseModel):
                 "strategy": "",
                 "holdings": {},
                 "transactions": [],
-                "portfolio_value_time_series": []
+                "portfolio_value_time_series": [],
+                "cost_basis": {},
+                "realized_pnl": 0.0,
+                "total_invested": 0.0,
             }
             write_account(name, fields)
-        return cls(**fields)
+        account = cls(**fields)
+        account._saved_transactions = len(account.transactions)
+        account._saved_values = len(account.portfolio_value_time_series)
+        if "total_invested" not in fields:
+            account.rebuild_aggregates()
+            account.save()
+        return account
+
+    @classmethod
+    @contextmanager
+    def locked(cls, name: str):
+        """ Load the account inside a write transaction, so that reading, changing and saving it is atomic. """
+        with transaction():
+            yield cls.get(name)
     
     
+    @classmethod
+    def reset_all(cls, strategies: dict[str, str]) -> None:
+        """ Reset many accounts to a fresh start with the given strategies, in a single write. """
+        write_accounts({name: cls.fresh(name, strategy).model_dump() for name, strategy in strategies.items()})
+
+    @classmethod
+    def fresh(cls, name: str, strategy: str) -> "Account":
+        return cls(
+            name=name.lower(),
+            balance=INITIAL_BALANCE,
+            strategy=strategy,
+            holdings={},
+            transactions=[],
+            portfolio_value_time_series=[],
+        )
+
     def save(self):
-        write_account(self.name.lower(), self.model_dump())
+        """ Store the account, appending only the transactions and portfolio values added since it was loaded or last saved. """
+        update_account(
+            self.name.lower(),
+            self.model_dump(exclude={"transactions", "portfolio_value_time_series"}),
+            [transaction.model_dump() for transaction in self.transactions[self._saved_transactions:]],
+            self.portfolio_value_time_series[self._saved_values:],
+        )
+        self._saved_transactions = len(self.transactions)
+        self._saved_values = len(self.portfolio_value_time_series)
 
     def reset(self, strategy: str):
         self.balance = INITIAL_BALANCE
@@ -58,7 +149,11 @@ class Account(BaseModel):
         self.holdings = {}
         self.transactions = []
         self.portfolio_value_time_series = []
-        self.save()
+        self.cost_basis = {}
+        self.realized_pnl = 0.0
+        self.total_invested = 0.0
+        write_account(self.name.lower(), self.model_dump())
+        self._saved_transactions = self._saved_values = 0
 
     def deposit(self, amount: float):
         """ Deposit funds into the account. """
@@ -89,10 +184,12 @@ class Account(BaseModel):
         
         # Update holdings
         self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        timestamp = clock().strftime("%Y-%m-%d %H:%M:%S")
         # Record transaction
         transaction = Transaction(symbol=symbol, quantity=quantity, price=buy_price, timestamp=timestamp, rationale=rationale)
         self.transactions.append(transaction)
+        self.cost_basis[symbol] = self.cost_basis.get(symbol, 0.0) + total_cost
+        self.total_invested += total_cost
         
         # Update balance
         self.balance -= total_cost
@@ -109,13 +206,18 @@ class Account(BaseModel):
         sell_price = price * (1 - SPREAD)
         total_proceeds = sell_price * quantity
         
-        # Update holdings
+        # Update holdings and the cost basis of what is left, at average cost
+        sold_cost = self.cost_basis.get(symbol, 0.0) * quantity / self.holdings[symbol]
+        self.cost_basis[symbol] = self.cost_basis.get(symbol, 0.0) - sold_cost
+        self.realized_pnl += total_proceeds - sold_cost
+        self.total_invested -= total_proceeds
         self.holdings[symbol] -= quantity
         
         # If shares are completely sold, remove from holdings
         if self.holdings[symbol] == 0:
             del self.holdings[symbol]
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            del self.cost_basis[symbol]
+        timestamp = clock().strftime("%Y-%m-%d %H:%M:%S")
         # Record transaction
         transaction = Transaction(symbol=symbol, quantity=-quantity, price=sell_price, timestamp=timestamp, rationale=rationale)  # negative quantity for sell
         self.transactions.append(transaction)
@@ -129,14 +231,41 @@ class Account(BaseModel):
     def calculate_portfolio_value(self):
         """ Calculate the total value of the user's portfolio. """
         total_value = self.balance
+        prices = get_share_prices(list(self.holdings))
         for symbol, quantity in self.holdings.items():
-            total_value += get_share_price(symbol) * quantity
+            total_value += prices[symbol] * quantity
         return total_value
 
     def calculate_profit_loss(self, portfolio_value: float):
         """ Calculate profit or loss from the initial spend. """
-        initial_spend = sum(transaction.total() for transaction in self.transactions)
-        return portfolio_value - initial_spend - self.balance
+        return portfolio_value - self.total_invested - self.balance
+
+    def history(self) -> list[Transaction]:
+        """ The full transaction history: what is stored, followed by anything not saved yet. """
+        stored = [Transaction(**transaction) for transaction in read_transactions(self.name)]
+        return stored + self.transactions[self._saved_transactions:]
+
+    def rebuild_aggregates(self):
+        """ Recompute the running aggregates from the full transaction history. """
+        self.cost_basis, self.realized_pnl, self.total_invested = aggregates_from_transactions(self.history())
+
+    def check_aggregates(self, tolerance: float = 1e-6) -> list[str]:
+        """ Compare the running aggregates with a replay of the history; return any discrepancies. """
+        cost_basis, realized_pnl, total_invested = aggregates_from_transactions(self.history())
+
+        def differs(actual: float, expected: float) -> bool:
+            return not math.isclose(actual, expected, rel_tol=1e-9, abs_tol=tolerance)
+
+        problems = []
+        if differs(self.total_invested, total_invested):
+            problems.append(f"total_invested is {self.total_invested}, history gives {total_invested}")
+        if differs(self.realized_pnl, realized_pnl):
+            problems.append(f"realized_pnl is {self.realized_pnl}, history gives {realized_pnl}")
+        for symbol in cost_basis.keys() | self.cost_basis.keys():
+            expected, actual = cost_basis.get(symbol, 0.0), self.cost_basis.get(symbol, 0.0)
+            if differs(actual, expected):
+                problems.append(f"cost_basis[{symbol}] is {actual}, history gives {expected}")
+        return problems
 
     def get_holdings(self):
         """ Report the current holdings of the user. """
@@ -148,15 +277,16 @@ class Account(BaseModel):
 
     def list_transactions(self):
         """ List all transactions made by the user. """
-        return [transaction.model_dump() for transaction in self.transactions]
+        return [transaction.model_dump() for transaction in self.history()]
     
     def report(self) -> str:
         """ Return a json string representing the account.  """
         portfolio_value = self.calculate_portfolio_value()
-        self.portfolio_value_time_series.append((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), portfolio_value))
+        self.portfolio_value_time_series.append((clock().strftime("%Y-%m-%d %H:%M:%S"), portfolio_value))
         self.save()
         pnl = self.calculate_profit_loss(portfolio_value)
-        data = self.model_dump()
+        data = self.model_dump(exclude={"transactions"})
+        data["transactions"] = [transaction.model_dump() for transaction in self.transactions[-TRANSACTION_WINDOW:]]
         data["total_portfolio_value"] = portfolio_value
         data["total_profit_loss"] = pnl
         write_log(self.name, "account", f"Retrieved account details")
@@ -174,6 +304,26 @@ class Account(BaseModel):
         write_log(self.name, "account", f"Changed strategy")
         return "Changed strategy"
 
+async def with_account(name: str, action: Callable[[Account], T], symbols: list[str] = ()) -> T:
+    """
+    Run action on the named account as one atomic read-modify-write and return its result.
+    Calls for the same account wait on an asyncio lock, then run in a worker thread inside
+    BEGIN IMMEDIATE so writers in other processes wait too; different accounts run in parallel.
+    Prices for the holdings and any extra symbols are fetched first, so the write lock is not
+    held across calls to the market data provider.
+    """
+    name = name.lower()
+    async with _account_locks.setdefault(name, asyncio.Lock()):
+        held = list(await asyncio.to_thread(read_holdings, name))
+        await get_share_prices_async(held + [symbol for symbol in symbols if symbol not in held])
+
+        def run():
+            with Account.locked(name) as account:
+                return action(account)
+
+        return await asyncio.to_thread(run)
+
+
 # Example of usage:
 if __name__ == "__main__":
     account = Account("John Doe")
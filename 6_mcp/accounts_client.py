@@ -1,41 +1,130 @@
+import asyncio
 import mcp
 from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
 from mcp import StdioServerParameters
+from mcp.types import CONNECTION_CLOSED
 from agents import FunctionTool
 import json
 
 params = StdioServerParameters(command="uv", args=["run", "accounts_server.py"], env=None)
+# Safe to send twice: if the connection fails mid-call these are retried, anything else is not,
+# as the server may already have carried out a trade before the pipe broke
+IDEMPOTENT_METHODS = {"list_tools", "read_resource"}
+READ_ONLY_TOOLS = {"get_balance", "get_holdings"}
+
+
+class AccountsClient:
+    """
+    A single accounts server session, started on first use and shared by every caller.
+    ClientSession matches responses to requests by id, so concurrent calls are safe once it is up;
+    only connecting is serialized. The stdio transport has to be closed by the task that opened it,
+    so the session lives in its own task until close() is called or the connection fails, after
+    which the next request starts a fresh one.
+    """
+
+    def __init__(self, params: StdioServerParameters):
+        self.params = params
+        self.session = None
+        self.task = None
+        self.loop = None
+        self.stop = None
+        self.lock = None
+        self.tools = None
+
+    async def _serve(self, ready: asyncio.Future) -> None:
+        try:
+            async with stdio_client(self.params) as streams:
+                async with mcp.ClientSession(*streams) as session:
+                    await session.initialize()
+                    self.session = session
+                    ready.set_result(session)
+                    await self.stop.wait()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            self.session = None
+
+    async def get_session(self) -> mcp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # Sessions can't be shared between event loops, e.g. across separate asyncio.run calls
+            self.loop, self.lock, self.task, self.session = loop, asyncio.Lock(), None, None
+        async with self.lock:
+            if self.session is None or self.task is None or self.task.done():
+                self.stop = asyncio.Event()
+                ready = loop.create_future()
+                self.task = asyncio.create_task(self._serve(ready))
+                await ready
+            return self.session
+
+    @staticmethod
+    def retryable(method: str, *args) -> bool:
+        return method in IDEMPOTENT_METHODS or (method == "call_tool" and args[0] in READ_ONLY_TOOLS)
+
+    async def request(self, method: str, *args):
+        """
+        Call a ClientSession method. If the connection has failed, the session is dropped so the
+        next request starts a fresh one, and idempotent calls are retried once on it straight away.
+        """
+        session = await self.get_session()
+        try:
+            return await getattr(session, method)(*args)
+        except Exception as e:
+            if isinstance(e, McpError) and e.error.code != CONNECTION_CLOSED:
+                raise
+            await self.reset(session)
+            if not self.retryable(method, *args):
+                print(f"Accounts server connection failed during {method}, not retrying: {e}")
+                raise
+            print(f"Accounts server connection failed, reconnecting: {e}")
+            session = await self.get_session()
+            return await getattr(session, method)(*args)
+
+    async def reset(self, session: mcp.ClientSession) -> None:
+        async with self.lock:
+            if self.session is session:
+                await self._shutdown()
+
+    async def _shutdown(self) -> None:
+        if self.task:
+            self.stop.set()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def close(self) -> None:
+        if self.lock and self.loop is asyncio.get_running_loop():
+            async with self.lock:
+                await self._shutdown()
+
+
+client = AccountsClient(params)
 
 
 async def list_accounts_tools():
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            tools_result = await session.list_tools()
-            return tools_result.tools
-        
+    if client.tools is None:
+        tools_result = await client.request("list_tools")
+        client.tools = tools_result.tools
+    return client.tools
+
 async def call_accounts_tool(tool_name, tool_args):
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            result = await session.call_tool(tool_name, tool_args)
-            return result
-            
+    return await client.request("call_tool", tool_name, tool_args)
+
 async def read_accounts_resource(name):
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            result = await session.read_resource(f"accounts://accounts_server/{name}")
-            return result.contents[0].text
-        
+    result = await client.request("read_resource", f"accounts://accounts_server/{name}")
+    return result.contents[0].text
+
 async def read_strategy_resource(name):
-    async with stdio_client(params) as streams:
-        async with mcp.ClientSession(*streams) as session:
-            await session.initialize()
-            result = await session.read_resource(f"accounts://strategy/{name}")
-            return result.contents[0].text
+    result = await client.request("read_resource", f"accounts://strategy/{name}")
+    return result.contents[0].text
+
+_openai_tools = None
 
 async def get_accounts_tools_openai():
+    global _openai_tools
+    if _openai_tools is not None:
+        return _openai_tools
     openai_tools = []
     for tool in await list_accounts_tools():
         schema = {**tool.inputSchema, "additionalProperties": False}
@@ -44,7 +133,8 @@ async def get_accounts_tools_openai():
             description=tool.description,
             params_json_schema=schema,
             on_invoke_tool=lambda ctx, args, toolname=tool.name: call_accounts_tool(toolname, json.loads(args))
-                
+
         )
         openai_tools.append(openai_tool)
-    return openai_tools
\ No newline at end of file
+    _openai_tools = openai_tools
+    return openai_tools
@@ -1,10 +1,22 @@
 import gradio as gr
 from util import css, js, Color
 import pandas as pd
+import threading
+import time
+from collections import deque
 from trading_floor import names, lastnames, short_model_names
 import plotly.express as px
 from accounts import Account
-from database import read_log
+from database import read_account_version, read_last_transaction_id
+from log_stream import broadcaster
+from timeseries import portfolio_series
+
+LOG_LINES = 13
+# About one point per pixel of the chart's width
+CHART_POINTS = 400
+# The headline value depends on live prices as well as the account, so it is recomputed at least this often
+PORTFOLIO_VALUE_TTL_SECONDS = 60
+PANELS = ("portfolio_value", "chart", "holdings", "transactions")
 
 mapper = {
     "trace": Color.WHITE,
@@ -22,10 +34,49 @@ class Trader:
         self.lastname = lastname
         self.model_name = model_name
         self.account = Account.get(name)
+        self.lock = threading.Lock()
+        self.version = None
+        self.last_transaction_id = None
+        self.panels = {}
+        self.panel_keys = {}
+        self.panel_versions = dict.fromkeys(PANELS, 0)
+        self.value_expires = 0.0
 
     def reload(self):
         self.account = Account.get(self.name)
 
+    def _update_panel(self, panel: str, key, build) -> None:
+        """Rebuild a panel only when the data it shows has changed, and bump its version if so"""
+        if panel not in self.panels or self.panel_keys[panel] != key:
+            self.panels[panel] = build()
+            self.panel_keys[panel] = key
+            self.panel_versions[panel] += 1
+
+    def get_panels(self) -> tuple[dict, dict[str, int]]:
+        """
+        The rendered panels and their versions, shared by every browser session.
+        The account is only reloaded when its version in the database has moved on, and
+        then only the panels whose data changed are rebuilt.
+        """
+        with self.lock:
+            version = read_account_version(self.name)
+            changed = version != self.version
+            if changed:
+                self.reload()
+                self.version = version
+                self.last_transaction_id = read_last_transaction_id(self.name)
+            series = self.account.portfolio_value_time_series
+            self._update_panel("chart", tuple(series[-1]) if series else None, self.get_portfolio_value_chart)
+            self._update_panel("holdings", tuple(sorted(self.account.holdings.items())), self.get_holdings_df)
+            self._update_panel("transactions", self.last_transaction_id, self.get_transactions_df)
+            if changed or time.monotonic() >= self.value_expires:
+                self.value_expires = time.monotonic() + PORTFOLIO_VALUE_TTL_SECONDS
+            self._update_panel("portfolio_value", self.value_expires, self.get_portfolio_value)
+            return dict(self.panels), dict(self.panel_versions)
+
+    def get_panel(self, panel: str):
+        return self.get_panels()[0][panel]
+
     def get_title(self) -> str:
         return f"<div style='text-align: center;font-size:34px;'>{self.name}<span style='color:#ccc;font-size:24px;'> ({self.model_name}) - {self.lastname}</span></div>"
 
@@ -33,7 +84,7 @@ class Trader:
         return self.account.get_strategy()
 
     def get_portfolio_value_df(self) -> pd.DataFrame:
-        df = pd.DataFrame(self.account.portfolio_value_time_series, columns=["datetime", "value"])
+        df = pd.DataFrame(portfolio_series(self.name, CHART_POINTS), columns=["datetime", "value"])
         df["datetime"] = pd.to_datetime(df["datetime"])
         return df
 
@@ -80,17 +131,14 @@ class Trader:
         emoji = "⬆" if pnl >= 0 else "⬇"
         return f"<div style='text-align: center;background-color:{color};'><span style='font-size:32px'>${portfolio_value:,.0f}</span><span style='font-size:24px'>&nbsp;&nbsp;&nbsp;{emoji}&nbsp;${pnl:,.0f}</span></div>"
 
-    def get_logs(self, previous=None) -> str:
-        logs = read_log(self.name, last_n=13)
-        response = ""
-        for log in logs:
-            timestamp, type, message = log
-            color = mapper.get(type, Color.WHITE).value
-            response += f"<span style='color:{color}'>{timestamp} : [{type}] {message}</span><br/>"
-        response = f"<div style='height:250px; overflow-y:auto;'>{response}</div>"
-        if response != previous:
-            return response
-        return gr.update()
+    async def stream_logs(self):
+        """Yield the log panel each time new log entries arrive for this trader"""
+        lines = deque(maxlen=LOG_LINES)
+        async for logs in broadcaster.subscribe(self.name, backlog=LOG_LINES):
+            for _, timestamp, type, message in logs:
+                color = mapper.get(type, Color.WHITE).value
+                lines.append(f"<span style='color:{color}'>{timestamp} : [{type}] {message}</span><br/>")
+            yield f"<div style='height:250px; overflow-y:auto;'>{''.join(lines)}</div>"
 
 
 class TraderView:
@@ -105,16 +153,16 @@ class TraderView:
         with gr.Column():
             gr.HTML(self.trader.get_title())
             with gr.Row():
-                self.portfolio_value = gr.HTML(self.trader.get_portfolio_value)
+                self.portfolio_value = gr.HTML(lambda: self.trader.get_panel("portfolio_value"))
             with gr.Row():
                 self.chart = gr.Plot(
-                    self.trader.get_portfolio_value_chart, container=True, show_label=False
+                    lambda: self.trader.get_panel("chart"), container=True, show_label=False
                 )
             with gr.Row(variant="panel"):
-                self.log = gr.HTML(self.trader.get_logs)
+                self.log = gr.HTML()
             with gr.Row():
                 self.holdings_table = gr.Dataframe(
-                    value=self.trader.get_holdings_df,
+                    value=lambda: self.trader.get_panel("holdings"),
                     label="Holdings",
                     headers=["Symbol", "Quantity"],
                     row_count=(5, "dynamic"),
@@ -124,7 +172,7 @@ class TraderView:
                 )
             with gr.Row():
                 self.transactions_table = gr.Dataframe(
-                    value=self.trader.get_transactions_df,
+                    value=lambda: self.trader.get_panel("transactions"),
                     label="Recent Transactions",
                     headers=["Timestamp", "Symbol", "Quantity", "Price", "Rationale"],
                     row_count=(5, "dynamic"),
@@ -133,36 +181,27 @@ class TraderView:
                     elem_classes=["dataframe-fix"],
                 )
 
+        # Panel versions this browser session has already been sent
+        seen = gr.State({})
         timer = gr.Timer(value=120)
         timer.tick(
             fn=self.refresh,
-            inputs=[],
+            inputs=[seen],
             outputs=[
                 self.portfolio_value,
                 self.chart,
                 self.holdings_table,
                 self.transactions_table,
+                seen,
             ],
             show_progress="hidden",
             queue=False,
         )
-        log_timer = gr.Timer(value=0.5)
-        log_timer.tick(
-            fn=self.trader.get_logs,
-            inputs=[self.log],
-            outputs=[self.log],
-            show_progress="hidden",
-            queue=False,
-        )
 
-    def refresh(self):
-        self.trader.reload()
-        return (
-            self.trader.get_portfolio_value(),
-            self.trader.get_portfolio_value_chart(),
-            self.trader.get_holdings_df(),
-            self.trader.get_transactions_df(),
-        )
+    def refresh(self, seen: dict[str, int]):
+        panels, versions = self.trader.get_panels()
+        updates = tuple(panels[panel] if seen.get(panel) != versions[panel] else gr.skip() for panel in PANELS)
+        return (*updates, versions)
 
 
 # Main UI construction
@@ -181,6 +220,13 @@ def create_ui():
         with gr.Row():
             for trader_view in trader_views:
                 trader_view.make_ui()
+        for trader_view in trader_views:
+            ui.load(
+                fn=trader_view.trader.stream_logs,
+                outputs=[trader_view.log],
+                show_progress="hidden",
+                concurrency_limit=None,
+            )
 
     return ui
 
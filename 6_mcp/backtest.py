@@ -0,0 +1,306 @@
+"""
+Offline backtests for trader strategies, replaying historical prices instead of trading live.
+
+Prices come from the market_prices table of an accounts database, from a CSV file
+(wide: date,AAPL,MSFT,... or long: date,symbol,price), or are generated synthetically.
+The decision layer is a deterministic strategy in place of the LLM, so runs are repeatable.
+
+Two engines share the same rebalancing rules:
+- simulate() runs many accounts at once, vectorized with NumPy, for parameter sweeps
+- replay() drives a real Account through market.get_share_price with a simulated clock,
+  to check that the vectorized engine matches what the trading floor would do
+
+    uv run backtest.py --synthetic 2520
+    uv run backtest.py --csv prices.csv --lookbacks 5 10 20 60 --top 1 3 5
+    uv run backtest.py --database accounts.db --start 2024-01-01 --replay
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import database
+
+TRADING_DAYS_PER_YEAR = 252
+DEFAULT_REBALANCE_EVERY = 5
+
+
+class PriceHistory:
+    """Closing prices as a days x symbols matrix, forward-filled; NaN until a symbol first trades"""
+
+    def __init__(self, dates: list[str], symbols: list[str], prices: np.ndarray):
+        self.dates = dates
+        self.symbols = symbols
+        self.prices = forward_fill(prices)
+
+    @classmethod
+    def from_rows(cls, rows: dict[str, dict[str, float]], symbols: list[str] | None = None) -> "PriceHistory":
+        dates = sorted(rows)
+        symbols = symbols or sorted({symbol for day in rows.values() for symbol in day})
+        column = {symbol: i for i, symbol in enumerate(symbols)}
+        prices = np.full((len(dates), len(symbols)), np.nan)
+        for d, date in enumerate(dates):
+            for symbol, price in rows[date].items():
+                if symbol in column and price:
+                    prices[d, column[symbol]] = price
+        return cls(dates, symbols, prices)
+
+    def prices_on(self, day: int) -> dict[str, float]:
+        return {symbol: float(price) for symbol, price in zip(self.symbols, self.prices[day]) if not np.isnan(price)}
+
+
+def forward_fill(prices: np.ndarray) -> np.ndarray:
+    index = np.where(np.isnan(prices), 0, np.arange(len(prices))[:, None])
+    np.maximum.accumulate(index, axis=0, out=index)
+    filled = prices[index, np.arange(prices.shape[1])]
+    return filled
+
+
+def load_prices_from_database(
+    path: str, start: str | None = None, end: str | None = None, symbols: list[str] | None = None
+) -> PriceHistory:
+    database.use_database(path)
+    return PriceHistory.from_rows(dict(database.iter_market_history(start, end, symbols)), symbols)
+
+
+def load_prices_from_csv(path: str) -> PriceHistory:
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        rows: dict[str, dict[str, float]] = {}
+        if {"date", "symbol", "price"} <= set(reader.fieldnames):
+            for row in reader:
+                rows.setdefault(row["date"], {})[row["symbol"]] = float(row["price"])
+        else:
+            for row in reader:
+                date = row.pop("date")
+                rows[date] = {symbol: float(price) for symbol, price in row.items() if price}
+    return PriceHistory.from_rows(rows)
+
+
+def synthetic_prices(days: int, symbols: int = 50, seed: int = 0) -> PriceHistory:
+    """Geometric Brownian motion with a different drift and volatility per symbol"""
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(0.0003, 0.0004, symbols)
+    volatility = rng.uniform(0.01, 0.03, symbols)
+    returns = rng.normal(drift, volatility, (days, symbols))
+    prices = rng.uniform(20, 500, symbols) * np.exp(np.cumsum(returns, axis=0))
+    first = datetime(2000, 1, 3)
+    dates = [(first + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(days)]
+    return PriceHistory(dates, [f"SYM{i}" for i in range(symbols)], np.round(prices, 2))
+
+
+class MomentumStrategy:
+    """
+    Deterministic stand-in for the trader's decisions: hold the top_n symbols by return over
+    the last lookback days, equally weighted. Each account gets its own lookback and top_n,
+    so one instance describes a whole parameter sweep. Accounts stay in cash until they
+    have lookback days of history.
+    """
+
+    def __init__(self, lookbacks: list[int], top_ns: list[int]):
+        self.lookbacks = np.asarray(lookbacks)
+        self.top_ns = np.asarray(top_ns)
+        self.accounts = len(lookbacks)
+
+    @classmethod
+    def sweep(cls, lookbacks: list[int], top_ns: list[int]) -> "MomentumStrategy":
+        grid = list(itertools.product(lookbacks, top_ns))
+        return cls([lookback for lookback, _ in grid], [top_n for _, top_n in grid])
+
+    def labels(self) -> list[str]:
+        return [f"lookback={lookback} top={top_n}" for lookback, top_n in zip(self.lookbacks, self.top_ns)]
+
+    def weights(self, prices: np.ndarray, day: int) -> np.ndarray:
+        """Target portfolio weights, accounts x symbols"""
+        past = prices[np.maximum(day - self.lookbacks, 0)]
+        momentum = prices[day] / past - 1
+        momentum[np.isnan(momentum)] = -np.inf
+        ranks = np.argsort(np.argsort(-momentum, axis=1), axis=1)
+        chosen = (ranks < self.top_ns[:, None]) & np.isfinite(momentum)
+        chosen[day < self.lookbacks] = False
+        counts = np.maximum(chosen.sum(axis=1, keepdims=True), 1)
+        return chosen / counts
+
+
+def orders(weights: np.ndarray, holdings: np.ndarray, cash: np.ndarray, prices: np.ndarray, spread: float) -> np.ndarray:
+    """
+    Share quantities to trade (positive buys, negative sells), accounts x symbols, to move each
+    account towards its target weights. Sells are executed first, and buys are scaled down so
+    that they never cost more than the cash available after the sells.
+    """
+    prices = np.nan_to_num(prices)
+    value = cash + holdings @ prices
+    buy_prices = prices * (1 + spread)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        target = np.where(buy_prices > 0, np.floor(weights * value[:, None] / buy_prices), 0)
+    trades = target - holdings
+    sells = np.minimum(trades, 0)
+    buys = np.maximum(trades, 0)
+    available = cash - (sells * prices * (1 - spread)).sum(axis=1)
+    cost = (buys * buy_prices).sum(axis=1)
+    scale = np.where(cost > available, available / np.where(cost > 0, cost, 1), 1.0)
+    buys = np.floor(buys * scale[:, None])
+    return (sells + buys).astype(np.int64)
+
+
+class BacktestResult:
+    def __init__(self, history: PriceHistory, labels: list[str], values: np.ndarray, trades: np.ndarray):
+        self.history = history
+        self.labels = labels
+        self.values = values
+        self.trades = trades
+
+    def stats(self, initial_balance: float) -> list[dict]:
+        returns = np.diff(self.values, axis=1) / self.values[:, :-1]
+        volatility = returns.std(axis=1)
+        sharpe = np.where(
+            volatility > 0, returns.mean(axis=1) / np.where(volatility > 0, volatility, 1), 0
+        ) * np.sqrt(TRADING_DAYS_PER_YEAR)
+        drawdown = 1 - self.values / np.maximum.accumulate(self.values, axis=1)
+        return [
+            {
+                "strategy": label,
+                "final_value": float(self.values[a, -1]),
+                "profit_loss": float(self.values[a, -1] - initial_balance),
+                "sharpe": float(sharpe[a]),
+                "max_drawdown": float(drawdown[a].max()),
+                "trades": int(self.trades[a]),
+            }
+            for a, label in enumerate(self.labels)
+        ]
+
+
+def simulate(
+    history: PriceHistory,
+    strategy: MomentumStrategy,
+    initial_balance: float,
+    spread: float,
+    rebalance_every: int = DEFAULT_REBALANCE_EVERY,
+) -> BacktestResult:
+    """Run every account in the strategy over the whole history at once"""
+    days, symbols = history.prices.shape
+    cash = np.full(strategy.accounts, initial_balance)
+    holdings = np.zeros((strategy.accounts, symbols))
+    values = np.empty((strategy.accounts, days))
+    trades = np.zeros(strategy.accounts, dtype=np.int64)
+    for day in range(days):
+        prices = np.nan_to_num(history.prices[day])
+        if day % rebalance_every == 0:
+            quantities = orders(strategy.weights(history.prices, day), holdings, cash, prices, spread)
+            sells, buys = np.minimum(quantities, 0), np.maximum(quantities, 0)
+            cash -= (sells * prices * (1 - spread)).sum(axis=1)
+            cash -= (buys * prices * (1 + spread)).sum(axis=1)
+            holdings += quantities
+            trades += np.count_nonzero(quantities, axis=1)
+        values[:, day] = cash + holdings @ prices
+    return BacktestResult(history, strategy.labels(), values, trades)
+
+
+def replay(
+    history: PriceHistory,
+    strategy: MomentumStrategy,
+    account_index: int = 0,
+    rebalance_every: int = DEFAULT_REBALANCE_EVERY,
+    name: str = "backtest",
+    database_path: str | None = None,
+) -> np.ndarray:
+    """
+    Trade one of the strategy's accounts through a real Account, answering market lookups from
+    the history and stamping transactions with the simulated date. Returns the daily portfolio values.
+    The account and its logs are written to database_path, or to a new scratch database if it is
+    not given, never to the live one; the process goes back to its previous database afterwards.
+    """
+    import accounts
+    import market
+
+    previous = database.DB
+    database.use_database(database_path or os.path.join(tempfile.mkdtemp(prefix="backtest_"), "accounts.db"))
+    day = 0
+    market.price_source = lambda symbols: {symbol: history.prices_on(day).get(symbol, 0.0) for symbol in symbols}
+    accounts.clock = lambda: datetime.strptime(history.dates[day], "%Y-%m-%d").replace(hour=16)
+    try:
+        account = accounts.Account.get(name)
+        account.reset(strategy.labels()[account_index])
+        values = np.empty(len(history.dates))
+        columns = {symbol: i for i, symbol in enumerate(history.symbols)}
+        for day in range(len(history.dates)):
+            prices = np.nan_to_num(history.prices[day])
+            if day % rebalance_every == 0:
+                holdings = np.zeros((1, len(history.symbols)))
+                for symbol, quantity in account.holdings.items():
+                    holdings[0, columns[symbol]] = quantity
+                weights = strategy.weights(history.prices, day)[account_index : account_index + 1]
+                quantities = orders(weights, holdings, np.array([account.balance]), prices, accounts.SPREAD)[0]
+                for i in np.flatnonzero(quantities < 0):
+                    account.sell_shares(history.symbols[i], int(-quantities[i]), "Backtest rebalance")
+                for i in np.flatnonzero(quantities > 0):
+                    account.buy_shares(history.symbols[i], int(quantities[i]), "Backtest rebalance")
+            values[day] = account.calculate_portfolio_value()
+        return values
+    finally:
+        market.price_source = None
+        accounts.clock = datetime.now
+        database.use_database(previous)
+
+
+def print_stats(stats: list[dict]) -> None:
+    print(f"{'strategy':<24} {'final value':>12} {'P&L':>12} {'sharpe':>7} {'max dd':>7} {'trades':>7}")
+    for row in sorted(stats, key=lambda row: row["final_value"], reverse=True):
+        print(
+            f"{row['strategy']:<24} {row['final_value']:>12,.2f} {row['profit_loss']:>12,.2f} "
+            f"{row['sharpe']:>7.2f} {row['max_drawdown']:>7.1%} {row['trades']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest momentum strategies on historical prices")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--database", default="accounts.db", help="read prices from this accounts database")
+    source.add_argument("--csv", help="read prices from a CSV file")
+    source.add_argument("--synthetic", type=int, metavar="DAYS", help="generate this many days of prices")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--symbols", nargs="*")
+    parser.add_argument("--lookbacks", type=int, nargs="+", default=[5, 10, 20, 60])
+    parser.add_argument("--top", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--rebalance-every", type=int, default=DEFAULT_REBALANCE_EVERY)
+    parser.add_argument("--replay", action="store_true", help="also replay the best strategy through Account")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        history = synthetic_prices(args.synthetic)
+    elif args.csv:
+        history = load_prices_from_csv(args.csv)
+    else:
+        history = load_prices_from_database(args.database, args.start, args.end, args.symbols)
+    if not history.dates:
+        raise SystemExit("No price history found")
+    from accounts import INITIAL_BALANCE, SPREAD
+
+    strategy = MomentumStrategy.sweep(args.lookbacks, args.top)
+    start = time.perf_counter()
+    result = simulate(history, strategy, INITIAL_BALANCE, SPREAD, args.rebalance_every)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{len(history.dates)} days x {len(history.symbols)} symbols x {strategy.accounts} strategies "
+        f"in {elapsed:.2f} s ({len(history.dates) * strategy.accounts / elapsed * 60:,.0f} account-days/minute)"
+    )
+    stats = result.stats(INITIAL_BALANCE)
+    print_stats(stats)
+
+    if args.replay:
+        best = max(range(strategy.accounts), key=lambda a: stats[a]["final_value"])
+        start = time.perf_counter()
+        values = replay(history, strategy, best, args.rebalance_every)
+        elapsed = time.perf_counter() - start
+        difference = np.abs(values - result.values[best]).max()
+        print(
+            f"Replayed {stats[best]['strategy']} through Account in {elapsed:.1f} s; "
+            f"largest difference from the vectorized run: ${difference:.4f}"
+        )
@@ -0,0 +1,302 @@
+"""
+Regression benchmarks for the trading floor's hot paths, saved as JSON so that runs on
+different commits can be compared. Prices are fixed, so nothing here calls Polygon or a model,
+and everything runs against the same throwaway database as benchmarks.py.
+
+    uv run benchmark_suite.py                        # writes benchmark_results/<commit>.json
+    uv run benchmark_suite.py --only trades read_log
+    uv run benchmark_suite.py --compare benchmark_results/1a2b3c4.json
+
+With --compare, any metric that got worse by more than --threshold is reported and the
+exit status is 1, so the suite can gate a CI job.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import benchmarks  # noqa: F401  (points ACCOUNTS_DB at a throwaway database)
+import database
+import market
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(HERE, "benchmark_results")
+DEFAULT_THRESHOLD = 0.2
+PRICE = 100.0
+
+
+def metric(value: float, unit: str, better: str = "lower") -> dict:
+    return {"value": value, "unit": unit, "better": better}
+
+
+def latencies(values: list[float], unit: str = "ms") -> dict[str, dict]:
+    """Median and 95th percentile of per-call timings given in seconds"""
+    scale = 1_000 if unit == "ms" else 1_000_000
+    values = sorted(value * scale for value in values)
+    p95 = statistics.quantiles(values, n=20)[18] if len(values) > 1 else values[0]
+    return {"p50": metric(statistics.median(values), unit), "p95": metric(p95, unit)}
+
+
+def fixed_prices() -> None:
+    market.price_source = lambda symbols: {symbol: PRICE for symbol in symbols}
+
+
+def benchmark_trades(operations: int = 500) -> dict[str, dict]:
+    """Account.buy_shares and sell_shares, alternating, on one account with a growing history"""
+    from accounts import Account
+
+    fixed_prices()
+    Account.reset_all({"suite_trades": "benchmark"})
+    account = Account.get("suite_trades")
+    timings = []
+    start = time.perf_counter()
+    for i in range(operations):
+        began = time.perf_counter()
+        if i % 2 == 0:
+            account.buy_shares("AAPL", 1, "benchmark")
+        else:
+            account.sell_shares("AAPL", 1, "benchmark")
+        timings.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    return {"throughput": metric(operations / elapsed, "trades/s", "higher"), **latencies(timings)}
+
+
+def benchmark_report(sizes: tuple[int, ...] = (100, 1_000, 10_000), calls: int = 20) -> dict[str, dict]:
+    """Account.report() on accounts with more and more transactions"""
+    from accounts import Account
+    from seed import synthetic_account
+
+    fixed_prices()
+    results = {}
+    rng = random.Random(0)
+    for size in sizes:
+        name = f"suite_report_{size}"
+        database.write_accounts({name: synthetic_account(name, size, 0, rng)})
+        account = Account.get(name)
+        timings = []
+        for _ in range(calls):
+            began = time.perf_counter()
+            account.report()
+            timings.append(time.perf_counter() - began)
+        results[f"{size}_transactions"] = metric(statistics.median(timings) * 1_000, "ms")
+    return results
+
+
+def fake_span(name: str, i: int) -> SimpleNamespace:
+    span_data = SimpleNamespace(type="function", name=f"tool_{i % 10}", server=None)
+    return SimpleNamespace(trace_id=f"trace_{name}0{i:026d}", span_data=span_data, error=None)
+
+
+def benchmark_write_log(writes: int = 2_000, tracer_threads: int = 2) -> dict[str, dict]:
+    """write_log from the accounts while LogTracer callbacks from running traders flood the same table"""
+    from tracers import LogBuffer, LogTracer
+
+    tracer = LogTracer(LogBuffer())
+    stop = threading.Event()
+    emitted = [0] * tracer_threads
+
+    def trace(thread: int):
+        i = 0
+        while not stop.is_set():
+            span = fake_span(f"tracer{thread}", i)
+            tracer.on_span_start(span)
+            tracer.on_span_end(span)
+            i += 1
+            emitted[thread] += 2
+            if i % 100 == 0:
+                time.sleep(0.001)  # roughly the pace of a busy agent, rather than a spin loop
+
+    threads = [threading.Thread(target=trace, args=(thread,)) for thread in range(tracer_threads)]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    for i in range(writes):
+        database.write_log("suite_writer", "account", f"Bought {i} of AAPL")
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in threads:
+        thread.join()
+    flush_start = time.perf_counter()
+    tracer.force_flush()
+    flushed = time.perf_counter() - flush_start
+    tracer.shutdown()
+    return {
+        "write_log": metric(writes / elapsed, "writes/s", "higher"),
+        "tracer_entries": metric(sum(emitted) / elapsed, "entries/s", "higher"),
+        "tracer_backlog_flush": metric(flushed * 1_000, "ms"),
+    }
+
+
+def benchmark_read_log(
+    sizes: tuple[int, ...] = (10_000, 100_000, 1_000_000), traders: int = 40, calls: int = 200
+) -> dict[str, dict]:
+    """read_log for the dashboard's log panel as the logs table grows"""
+    results = {}
+    stored = 0
+    rng = random.Random(0)
+    for size in sizes:
+        while stored < size:
+            batch = min(50_000, size - stored)
+            database.write_logs(
+                [
+                    (f"suite_reader{rng.randrange(traders)}", "2025-01-01 00:00:00", "function", "Ended function")
+                    for _ in range(batch)
+                ]
+            )
+            stored += batch
+        timings = []
+        for i in range(calls):
+            began = time.perf_counter()
+            database.read_log(f"suite_reader{i % traders}", last_n=13)
+            timings.append(time.perf_counter() - began)
+        results[f"{size}_rows"] = metric(statistics.median(timings) * 1_000_000, "us")
+    return results
+
+
+def benchmark_mcp_round_trip(calls: int = 200, concurrent: int = 50) -> dict[str, dict]:
+    """A tool call through AccountsClient to a real accounts_server.py over stdio"""
+    from mcp import StdioServerParameters
+    from accounts_client import AccountsClient
+
+    params = StdioServerParameters(
+        command=sys.executable, args=[os.path.join(HERE, "accounts_server.py")], env=dict(os.environ)
+    )
+    client = AccountsClient(params)
+
+    async def run():
+        try:
+            start = time.perf_counter()
+            await client.request("call_tool", "get_balance", {"name": "suite_mcp"})
+            connect = time.perf_counter() - start
+            timings = []
+            for _ in range(calls):
+                began = time.perf_counter()
+                await client.request("call_tool", "get_balance", {"name": "suite_mcp"})
+                timings.append(time.perf_counter() - began)
+            start = time.perf_counter()
+            await asyncio.gather(
+                *[client.request("call_tool", "get_holdings", {"name": "suite_mcp"}) for _ in range(concurrent)]
+            )
+            gathered = time.perf_counter() - start
+        finally:
+            await client.close()
+        return {
+            "connect": metric(connect * 1_000, "ms"),
+            **latencies(timings),
+            "concurrent_throughput": metric(concurrent / gathered, "calls/s", "higher"),
+        }
+
+    return asyncio.run(run())
+
+
+BENCHMARKS = {
+    "trades": benchmark_trades,
+    "report": benchmark_report,
+    "write_log": benchmark_write_log,
+    "read_log": benchmark_read_log,
+    "mcp": benchmark_mcp_round_trip,
+}
+
+
+def current_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=HERE, capture_output=True, text=True
+        ).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(names: list[str]) -> dict:
+    """Run the named benchmarks; one that fails is recorded with its error and the rest still run"""
+    results = {}
+    for name in names:
+        print(f"Running {name}...", flush=True)
+        try:
+            results[name] = BENCHMARKS[name]()
+        except Exception as e:
+            print(f"  {name} failed: {e!r}")
+            results[name] = {"error": repr(e)}
+    return {
+        "commit": current_commit(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def report(run: dict) -> str:
+    lines = [f"Benchmarks at {run['commit']} ({run['created']})"]
+    for name, metrics in run["results"].items():
+        lines.append(f"  {name}")
+        if "error" in metrics:
+            lines.append(f"    failed: {metrics['error']}")
+            continue
+        for key, m in metrics.items():
+            lines.append(f"    {key:<24} {m['value']:>12,.2f} {m['unit']}")
+    return "\n".join(lines)
+
+
+def compare(baseline: dict, run: dict, threshold: float = DEFAULT_THRESHOLD) -> tuple[str, list[str]]:
+    """A side-by-side report and the metrics that got worse by more than threshold"""
+    lines = [f"{'metric':<34} {baseline['commit']:>14} {run['commit']:>14} {'change':>8}"]
+    regressions = []
+    for name, metrics in run["results"].items():
+        before_metrics = baseline["results"].get(name, {})
+        if "error" in metrics or "error" in before_metrics:
+            continue
+        for key, m in metrics.items():
+            before = before_metrics.get(key)
+            if not before or not before["value"]:
+                continue
+            change = m["value"] / before["value"] - 1
+            worse = -change if m["better"] == "higher" else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{name}.{key}")
+            lines.append(
+                f"{name + '.' + key:<34} {before['value']:>14,.2f} {m['value']:>14,.2f} {change:>+8.0%} {m['unit']}{flag}"
+            )
+    return "\n".join(lines), regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the regression benchmarks and save the results as JSON")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--output", help="where to save the results (default: benchmark_results/<commit>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with the results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    run = run_suite(args.only)
+    print(report(run))
+    output = args.output or os.path.join(RESULTS_DIR, f"{run['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"Saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        table, regressions = compare(baseline, run, args.threshold)
+        print(table)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
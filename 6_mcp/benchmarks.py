@@ -0,0 +1,614 @@
+"""
+Micro-benchmarks for the trading floor's storage layer.
+Runs against a throwaway database, so it is safe to run next to a live accounts.db:
+
+    uv run benchmarks.py
+"""
+
+import asyncio
+import contextlib
+import math
+import multiprocessing
+import os
+import random
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Kept in the environment so that worker processes share the same throwaway database
+if "TRADING_BENCHMARK_DIR" not in os.environ:
+    os.environ["TRADING_BENCHMARK_DIR"] = tempfile.mkdtemp(prefix="trading_benchmarks_")
+BENCHMARK_DIR = os.environ["TRADING_BENCHMARK_DIR"]
+os.environ["ACCOUNTS_DB"] = os.path.join(BENCHMARK_DIR, "accounts.db")
+
+import database  # noqa: E402  (must be imported after ACCOUNTS_DB is set)
+
+WRITES = 2_000
+THREADS = 4
+LOG_LINES = 13
+STREAM_SECONDS = 3.0
+STREAM_WRITES_PER_SECOND = 20
+STRESS_ACCOUNTS = 4
+STRESS_OPERATIONS = 2_000
+STRESS_PROCESSES = 2
+
+
+def legacy_write_log(db: str, name: str, type: str, message: str):
+    """The write path before pooling: a fresh connection and a full fsync per entry"""
+    with sqlite3.connect(db) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO logs (name, datetime, type, message) VALUES (?, datetime('now'), ?, ?)",
+            (name.lower(), type, message),
+        )
+        conn.commit()
+
+
+def run_threads(target, threads: int, writes: int) -> float:
+    """Run target(name) on each thread, all writing concurrently; return writes per second"""
+    per_thread = writes // threads
+
+    def worker(name):
+        for i in range(per_thread):
+            target(name, i)
+
+    workers = [threading.Thread(target=worker, args=(f"trader{t}",)) for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def benchmark_write_log(writes: int = WRITES, threads: int = THREADS) -> dict[str, float]:
+    legacy_db = os.path.join(BENCHMARK_DIR, "legacy.db")
+    with sqlite3.connect(legacy_db) as conn:
+        conn.execute(
+            "CREATE TABLE logs (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, datetime DATETIME, type TEXT, message TEXT)"
+        )
+    before = run_threads(
+        lambda name, i: legacy_write_log(legacy_db, name, "function", f"Ended function {i}"),
+        threads,
+        writes,
+    )
+    after = run_threads(
+        lambda name, i: database.write_log(name, "function", f"Ended function {i}"),
+        threads,
+        writes,
+    )
+    return {"before": before, "after": after}
+
+
+def benchmark_log_buffer(writes: int = WRITES) -> dict[str, float]:
+    """Time spent inside the tracing callback per entry: a direct write vs. queueing for the writer thread"""
+    from tracers import LogBuffer
+
+    start = time.perf_counter()
+    for i in range(writes):
+        database.write_log("warren", "function", f"Ended function {i}")
+    direct = (time.perf_counter() - start) / writes
+
+    buffer = LogBuffer()
+    start = time.perf_counter()
+    for i in range(writes):
+        buffer.put("warren", "function", f"Ended function {i}")
+    buffered = (time.perf_counter() - start) / writes
+    buffer.shutdown()
+    return {"before": direct * 1e6, "after": buffered * 1e6}
+
+
+def write_logs_forever(names: list[str], per_second: float):
+    """Stand-in for the trading floor process: a steady trickle of log entries"""
+    while True:
+        database.write_log(random.choice(names), "function", "Ended function lookup_share_price")
+        time.sleep(1 / per_second)
+
+
+def render_logs(logs) -> str:
+    lines = "".join(f"<span>{timestamp} : [{type}] {message}</span><br/>" for timestamp, type, message in logs)
+    return f"<div style='height:250px; overflow-y:auto;'>{lines}</div>"
+
+
+def log_panel_server(port: int) -> None:
+    """
+    The dashboard process, reduced to its log panels: a Gradio app with the two ways of feeding one.
+    /poll is the old 0.5 s timer tick, which posts the panel's current HTML and gets it back re-read,
+    and /stream is the pushed stream that each panel now opens once.
+    """
+    import gradio as gr
+    from log_stream import broadcaster
+
+    def poll(name: str, previous: str):
+        html = render_logs(database.read_log(name, last_n=LOG_LINES))
+        return html if html != previous else gr.update()
+
+    async def stream(name: str):
+        lines = deque(maxlen=LOG_LINES)
+        async for logs in broadcaster.subscribe(name, backlog=LOG_LINES):
+            lines.extend(log[1:] for log in logs)
+            yield render_logs(lines)
+
+    with gr.Blocks() as ui:
+        name, previous, panel = gr.Textbox(), gr.HTML(), gr.HTML()
+        gr.Button().click(poll, [name, previous], panel, api_name="poll", queue=False)
+        gr.Button().click(stream, [name], panel, api_name="stream", concurrency_limit=None)
+    ui.launch(server_port=port, prevent_thread_lock=True, quiet=True)
+    threading.Event().wait()
+
+
+def poll_panel(url: str, name: str, stop: threading.Event) -> int:
+    """A browser tab's timer for one panel: a request every 0.5 s, sending the panel's HTML each time"""
+    import httpx
+
+    html, requests = "", 0
+    with httpx.Client() as client:
+        while not stop.is_set():
+            result = client.post(f"{url}gradio_api/run/poll", json={"data": [name, html]}).json()
+            if isinstance(result.get("data", [None])[0], str):
+                html = result["data"][0]
+            requests += 1
+            stop.wait(0.5)
+    return requests
+
+
+def measure_server_cpu(server: "psutil.Process", seconds: float) -> float:
+    """Percentage of one core used by the server process over the next seconds"""
+    before, wall = server.cpu_times(), time.perf_counter()
+    time.sleep(seconds)
+    after = server.cpu_times()
+    used = (after.user - before.user) + (after.system - before.system)
+    return used / (time.perf_counter() - wall) * 100
+
+
+def benchmark_log_streaming(traders: int, seconds: float = STREAM_SECONDS) -> dict[str, float]:
+    """
+    CPU used by a real Gradio server to keep each trader's log panel current, while idle and while
+    a separate process writes logs, for polling vs. the pushed stream. Clients run in this process
+    and the server's CPU is measured on its own, so each polling tick's HTTP request is counted.
+    """
+    import httpx
+    import psutil
+    from gradio_client import Client
+
+    with contextlib.closing(socket.socket()) as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    url = f"http://127.0.0.1:{port}/"
+    context = multiprocessing.get_context("spawn")
+    process = context.Process(target=log_panel_server, args=(port,), daemon=True)
+    process.start()
+    for _ in range(300):
+        with contextlib.suppress(httpx.HTTPError):
+            if httpx.get(url).status_code == 200:
+                break
+        time.sleep(0.1)
+    server = psutil.Process(process.pid)
+    names = [f"trader{i}" for i in range(traders)]
+    results = {}
+    try:
+        # Gradio's own background work, with no panels open, for reference
+        time.sleep(1.0)
+        results["no_panels"] = measure_server_cpu(server, seconds)
+        for state in ("idle", "active"):
+            writer = None
+            if state == "active":
+                writer = context.Process(target=write_logs_forever, args=(names, STREAM_WRITES_PER_SECOND), daemon=True)
+                writer.start()
+            stop = threading.Event()
+            pollers = [threading.Thread(target=poll_panel, args=(url, name, stop)) for name in names]
+            for poller in pollers:
+                poller.start()
+            time.sleep(1.0)
+            results[f"polling_{state}"] = measure_server_cpu(server, seconds)
+            stop.set()
+            for poller in pollers:
+                poller.join()
+
+            client = Client(url, verbose=False, max_workers=traders)
+            jobs = [client.submit(name, api_name="/stream") for name in names]
+            time.sleep(1.0)
+            results[f"streaming_{state}"] = measure_server_cpu(server, seconds)
+            for job in jobs:
+                job.cancel()
+            client.close()
+            if writer:
+                writer.terminate()
+                writer.join()
+    finally:
+        process.terminate()
+        process.join()
+    return results
+
+
+def benchmark_profit_loss(transactions: int = 100_000) -> dict[str, float]:
+    """calculate_profit_loss by summing the history vs. the running aggregates, plus a full rebuild"""
+    from accounts import Account, Transaction
+
+    symbols = [f"SYM{i}" for i in range(20)]
+    account = Account(
+        name="benchmark", balance=0.0, strategy="", holdings={}, transactions=[], portfolio_value_time_series=[]
+    )
+    for i in range(transactions):
+        symbol = random.choice(symbols)
+        held = account.holdings.get(symbol, 0)
+        quantity = -random.randint(1, held) if held and random.random() < 0.4 else random.randint(1, 10)
+        price = random.uniform(10, 500)
+        account.transactions.append(
+            Transaction(symbol=symbol, quantity=quantity, price=price, timestamp="", rationale="")
+        )
+        account.holdings[symbol] = held + quantity
+    start = time.perf_counter()
+    account.rebuild_aggregates()
+    rebuild = time.perf_counter() - start
+    assert not account.check_aggregates()
+
+    repeats = 100
+    start = time.perf_counter()
+    for _ in range(repeats):
+        account.balance + sum(transaction.total() for transaction in account.transactions)
+    before = (time.perf_counter() - start) / repeats
+    start = time.perf_counter()
+    for _ in range(repeats):
+        account.calculate_profit_loss(account.balance)
+    after = (time.perf_counter() - start) / repeats
+    return {"before": before * 1e6, "after": after * 1e6, "rebuild": rebuild * 1e3}
+
+
+class FakePolygonClient:
+    """Local stand-in for polygon.RESTClient that answers snapshot calls after a fixed latency"""
+
+    latency = 0.05
+    calls = 0
+
+    def __init__(self, api_key=None):
+        pass
+
+    def _snapshot(self, ticker: str):
+        from types import SimpleNamespace
+
+        return SimpleNamespace(
+            ticker=ticker, min=SimpleNamespace(close=100.0), prev_day=SimpleNamespace(close=99.0)
+        )
+
+    def get_snapshot_ticker(self, market_type: str, ticker: str):
+        FakePolygonClient.calls += 1
+        time.sleep(self.latency)
+        return self._snapshot(ticker)
+
+    def get_snapshot_all(self, market_type: str, tickers: list[str]):
+        FakePolygonClient.calls += 1
+        time.sleep(self.latency)
+        return [self._snapshot(ticker) for ticker in tickers]
+
+
+def benchmark_price_cache(traders: int = 4, rounds: int = 20) -> dict[str, float]:
+    """Traders asking for the same symbols at the same moment, against a fake paid Polygon plan"""
+    import market
+
+    market.RESTClient = FakePolygonClient
+    market.polygon_api_key = "fake"
+    market.is_live_polygon = True
+    market.price_cache.clear()
+    symbols = ["AAPL", "MSFT", "NVDA"]
+
+    def trader(_):
+        for i in range(rounds):
+            market.get_share_price(symbols[i % len(symbols)])
+
+    FakePolygonClient.calls = 0
+    start = time.perf_counter()
+    workers = [threading.Thread(target=trader, args=(t,)) for t in range(traders)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    sync_calls = FakePolygonClient.calls
+
+    async def burst():
+        market.price_cache.clear()
+        await asyncio.gather(*[market.get_share_prices_async(symbols) for _ in range(traders * 10)])
+
+    FakePolygonClient.calls = 0
+    asyncio.run(burst())
+    return {
+        "lookups": traders * rounds,
+        "api_calls": sync_calls,
+        "seconds": elapsed,
+        "async_lookups": traders * 10,
+        "async_api_calls": FakePolygonClient.calls,
+        **market.price_cache.stats(),
+    }
+
+
+def fixed_prices():
+    """Trade at a constant price so the stress test never touches the market data provider"""
+    import accounts
+
+    async def prices_async(symbols):
+        return {symbol: 100.0 for symbol in symbols}
+
+    accounts.get_share_price = lambda symbol: 100.0
+    accounts.get_share_prices = lambda symbols: {symbol: 100.0 for symbol in symbols}
+    accounts.get_share_prices_async = prices_async
+
+
+def account_stress_worker(names: list[str], operations: int, seed: int, locked: bool) -> int:
+    """Fire concurrent random buys and sells at the accounts; return how many succeeded"""
+    import accounts
+
+    fixed_prices()
+    rng = random.Random(seed)
+    symbols = ["AAPL", "MSFT", "NVDA"]
+
+    def trade(account, buy: bool, symbol: str, quantity: int):
+        if buy:
+            return account.buy_shares(symbol, quantity, "stress test")
+        return account.sell_shares(symbol, quantity, "stress test")
+
+    async def operation(name: str, buy: bool, symbol: str, quantity: int) -> bool:
+        try:
+            if locked:
+                await accounts.with_account(name, lambda account: trade(account, buy, symbol, quantity), [symbol])
+            else:
+                await asyncio.to_thread(lambda: trade(accounts.Account.get(name), buy, symbol, quantity))
+            return True
+        except ValueError:
+            return False  # insufficient funds or shares
+
+    async def burst():
+        results = await asyncio.gather(
+            *[
+                operation(rng.choice(names), rng.random() < 0.5, rng.choice(symbols), rng.randint(1, 5))
+                for _ in range(operations)
+            ]
+        )
+        return sum(results)
+
+    return asyncio.run(burst())
+
+
+def check_account_invariants(name: str) -> list[str]:
+    """The stored account must agree with its own transaction history"""
+    from accounts import Account, INITIAL_BALANCE
+
+    account = Account.get(name)
+    history = account.history()
+    problems = []
+    spent = sum(transaction.total() for transaction in history)
+    if not math.isclose(account.balance, INITIAL_BALANCE - spent, abs_tol=1e-6):
+        problems.append(f"balance is {account.balance}, history gives {INITIAL_BALANCE - spent}")
+    if account.balance < -1e-6:
+        problems.append(f"balance is negative: {account.balance}")
+    held: dict[str, int] = {}
+    for transaction in history:
+        held[transaction.symbol] = held.get(transaction.symbol, 0) + transaction.quantity
+        if held[transaction.symbol] < 0:
+            problems.append(f"history sells {transaction.symbol} shares that were never held")
+            return [f"{name}: {problem}" for problem in problems]
+    held = {symbol: quantity for symbol, quantity in held.items() if quantity}
+    if held != account.holdings:
+        problems.append(f"holdings are {account.holdings}, history gives {held}")
+    problems += account.check_aggregates()
+    return [f"{name}: {problem}" for problem in problems]
+
+
+def benchmark_account_stress(
+    accounts: int = STRESS_ACCOUNTS, operations: int = STRESS_OPERATIONS, processes: int = STRESS_PROCESSES
+) -> dict[str, dict]:
+    """
+    Concurrent buys and sells from several processes at once, without and with per-account locking.
+    Every successful trade must leave exactly one transaction behind and the invariants must hold.
+    """
+    from accounts import Account
+
+    names = [f"stress{i}" for i in range(accounts)]
+    results = {}
+    for locked in (False, True):
+        for name in names:
+            Account.get(name).reset("")
+        start = time.perf_counter()
+        with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [
+                pool.submit(account_stress_worker, names, operations // processes, seed, locked)
+                for seed in range(processes)
+            ]
+            succeeded = sum(future.result() for future in futures)
+        elapsed = time.perf_counter() - start
+        recorded = sum(len(database.read_transactions(name)) for name in names)
+        problems = [problem for name in names for problem in check_account_invariants(name)]
+        results["locked" if locked else "unlocked"] = {
+            "operations": operations,
+            "succeeded": succeeded,
+            "lost": succeeded - recorded,
+            "problems": problems,
+            "seconds": elapsed,
+        }
+    return results
+
+
+def benchmark_scheduler(traders: int = 60, cycles: int = 3, interval: float = 2.0) -> dict[str, dict]:
+    """
+    Simulated trader runs (0.1-0.8 s, a few hanging) under the old gather-then-sleep loop and the
+    TraderScheduler: how many runs start at the same instant, and how far cycles drift from their ticks
+    """
+    from scheduler import TraderScheduler
+
+    async def simulate(use_scheduler: bool) -> dict:
+        rng = random.Random(0)
+        starts: list[float] = []
+        cycle_starts: list[float] = []
+        origin = time.monotonic()
+
+        def make_jobs():
+            cycle_starts.append(time.monotonic() - origin)
+
+            async def job(duration: float):
+                starts.append(time.monotonic() - origin)
+                await asyncio.sleep(duration)
+
+            durations = [5.0 if rng.random() < 0.03 else rng.uniform(0.1, 0.8) for _ in range(traders)]
+            return [(f"trader{i}", lambda d=d: job(d)) for i, d in enumerate(durations)]
+
+        if use_scheduler:
+            scheduler = TraderScheduler(interval, concurrency=30, jitter=0.3, deadline=interval * 0.6)
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(scheduler.run_forever(make_jobs), interval * cycles - 0.01)
+            ticks = [cycle.tick for cycle in scheduler.history]
+            totals = scheduler.totals()
+        else:
+            for _ in range(cycles):
+                await asyncio.gather(*[job() for _, job in make_jobs()])
+                await asyncio.sleep(interval)
+            ticks = list(range(cycles))
+            totals = {}
+        burst = max(sum(1 for t in starts if start <= t < start + 0.05) for start in starts)
+        drift = max(start - tick * interval for tick, start in zip(ticks, cycle_starts))
+        return {"burst": burst, "drift": drift, **totals}
+
+    return {
+        "gather": asyncio.run(simulate(False)),
+        "scheduler": asyncio.run(simulate(True)),
+    }
+
+
+def benchmark_provider_limiter(requests_per_minute: float = 600, quiet_traders: int = 9) -> dict[str, float]:
+    """
+    One busy trader queues 60 model calls at once while other traders make 3 each, against a provider
+    allowing 10 requests/s: how long the quiet traders wait with a single FIFO queue vs. the fair limiter
+    """
+    from providers import ProviderConfig, ProviderLimiter
+
+    config = ProviderConfig(
+        name="fake", base_url=None, api_key_env="", requests_per_minute=requests_per_minute,
+        tokens_per_minute=10_000_000, max_connections=10, max_keepalive_connections=10,
+    )
+
+    async def simulate(fair: bool) -> dict[str, float]:
+        limiter = ProviderLimiter(config)
+        limiter.requests.level = 0  # start empty so every request is paced
+        waits: dict[str, list[float]] = {}
+
+        async def call(trader: str):
+            start = time.monotonic()
+            await limiter.acquire(trader if fair else "everyone", 100)
+            waits.setdefault(trader, []).append(time.monotonic() - start)
+
+        calls = [call("busy") for _ in range(60)]
+        calls += [call(f"quiet{i}") for i in range(quiet_traders) for _ in range(3)]
+        await asyncio.gather(*calls)
+        quiet = [wait for trader, trader_waits in waits.items() if trader != "busy" for wait in trader_waits]
+        return {"quiet_avg": sum(quiet) / len(quiet), "quiet_max": max(quiet), "busy_max": max(waits["busy"])}
+
+    return {"fifo": asyncio.run(simulate(False)), "fair": asyncio.run(simulate(True))}
+
+
+def benchmark_portfolio_history(sizes: tuple[int, ...] = (1_000, 100_000), chart_points: int = 400) -> dict[int, dict[str, float]]:
+    """
+    Cost of loading an account, saving one new portfolio value and building the chart series,
+    as the stored history grows: both should stay flat now that accounts hold a bounded window
+    """
+    from datetime import datetime, timedelta
+    from timeseries import portfolio_series
+
+    results = {}
+    for size in sizes:
+        name = f"history{size}"
+        database.write_account(name, {
+            "balance": 0.0, "strategy": "", "holdings": {}, "transactions": [], "portfolio_value_time_series": [],
+        })
+        start = datetime.now() - timedelta(days=60)
+        step = timedelta(days=60) / size
+        history = [
+            ((start + step * i).strftime("%Y-%m-%d %H:%M:%S"), 10_000 + random.uniform(-500, 500)) for i in range(size)
+        ]
+        for i in range(0, size, 10_000):
+            account = database.read_account(name)
+            database.update_account(name, account, portfolio_values=history[i : i + 10_000])
+        database.compact_portfolio_values()
+
+        repeats = 20
+        begin = time.perf_counter()
+        for _ in range(repeats):
+            account = database.read_account(name)
+            database.update_account(name, account, portfolio_values=[(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 10_000.0)])
+        save = (time.perf_counter() - begin) / repeats
+        begin = time.perf_counter()
+        points = len(portfolio_series(name, chart_points))
+        chart = time.perf_counter() - begin
+        results[size] = {"save": save * 1e3, "chart": chart * 1e3, "points": points}
+    return results
+
+
+if __name__ == "__main__":
+    results = benchmark_write_log()
+    print(f"write_log with {THREADS} threads, {WRITES} writes")
+    print(f"  connection per call: {results['before']:>10,.0f} writes/s")
+    print(f"  pooled WAL:          {results['after']:>10,.0f} writes/s")
+    print(f"  speedup:             {results['after'] / results['before']:>10.1f}x")
+
+    results = benchmark_log_buffer()
+    print(f"LogTracer callback latency, {WRITES} entries")
+    print(f"  direct write_log:    {results['before']:>10.1f} us/entry")
+    print(f"  LogBuffer.put:       {results['after']:>10.1f} us/entry")
+
+    results = benchmark_profit_loss()
+    print("calculate_profit_loss with 100,000 transactions")
+    print(f"  sum over history:    {results['before']:>10,.1f} us")
+    print(f"  running aggregates:  {results['after']:>10,.1f} us")
+    print(f"  full rebuild:        {results['rebuild']:>10,.1f} ms")
+
+    results = benchmark_price_cache()
+    print("get_share_price against a fake Polygon client with 50 ms latency")
+    print(f"  {results['lookups']} threaded lookups:    {results['api_calls']:>6} API calls in {results['seconds']:.2f} s")
+    print(f"  {results['async_lookups']} concurrent bulk lookups: {results['async_api_calls']:>3} API calls")
+    print(f"  cache hits/misses/coalesced: {results['hits']}/{results['misses']}/{results['coalesced']}")
+
+    results = benchmark_account_stress()
+    print(f"{STRESS_OPERATIONS} concurrent buys/sells over {STRESS_ACCOUNTS} accounts from {STRESS_PROCESSES} processes")
+    for mode in ("unlocked", "locked"):
+        result = results[mode]
+        print(
+            f"  {mode:<9} {result['succeeded']:>5} succeeded, {result['lost']:>5} lost, "
+            f"{len(result['problems']):>3} invariant violations, {result['seconds']:.2f} s"
+        )
+    for problem in results["locked"]["problems"]:
+        print(f"    {problem}")
+
+    results = benchmark_scheduler()
+    print("60 simulated traders, 3 cycles of 2 s (gather-then-sleep vs. TraderScheduler)")
+    for mode in ("gather", "scheduler"):
+        result = results[mode]
+        print(f"  {mode:<9} most runs started within 50 ms: {result['burst']:>3}, worst tick drift: {result['drift']:.2f} s")
+    totals = results["scheduler"]
+    print(f"  scheduler: {totals['timed_out']} runs cancelled at the deadline, max queueing delay {totals['max_queue_delay']:.2f} s")
+
+    results = benchmark_provider_limiter()
+    print("Model calls at 10 requests/s: one trader queues 60, nine others queue 3 each")
+    for mode in ("fifo", "fair"):
+        result = results[mode]
+        print(
+            f"  {mode:<5} quiet traders wait avg {result['quiet_avg']:.2f} s, max {result['quiet_max']:.2f} s; "
+            f"busy trader max {result['busy_max']:.2f} s"
+        )
+
+    results = benchmark_portfolio_history()
+    print("Portfolio value history: load + save one point, and the chart series")
+    for size, result in results.items():
+        print(
+            f"  {size:>7,} stored points: save {result['save']:>6.2f} ms, "
+            f"chart {result['chart']:>6.2f} ms for {result['points']} points"
+        )
+
+    for traders in (4, 40):
+        results = benchmark_log_streaming(traders)
+        print(f"Dashboard log panels, {traders} traders, Gradio server CPU % of one core (active = {STREAM_WRITES_PER_SECOND} logs/s)")
+        print(f"  no panels open        {results['no_panels']:>10.1f} %")
+        for state in ("idle", "active"):
+            print(f"  polling   {state:<6}     {results[f'polling_{state}']:>10.1f} %")
+            print(f"  streaming {state:<6}     {results[f'streaming_{state}']:>10.1f} %")
@@ -1,17 +1,102 @@
 import sqlite3
 import json
+import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
 
-DB = "accounts.db"
+DB = os.getenv("ACCOUNTS_DB", "accounts.db")
+BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "7"))
+# Raw portfolio values are kept this long, and at least the most recent PORTFOLIO_WINDOW of them;
+# older history survives as minute, hour and day rollups, the finer ones only for a while
+PORTFOLIO_WINDOW = int(os.getenv("PORTFOLIO_WINDOW", "500"))
+# Accounts load only their most recent transactions; the full history is read on demand
+TRANSACTION_WINDOW = int(os.getenv("TRANSACTION_WINDOW", "100"))
+PORTFOLIO_RETENTION_DAYS = {
+    "raw": int(os.getenv("PORTFOLIO_RAW_RETENTION_DAYS", "2")),
+    "minute": int(os.getenv("PORTFOLIO_MINUTE_RETENTION_DAYS", "30")),
+    "hour": int(os.getenv("PORTFOLIO_HOUR_RETENTION_DAYS", "365")),
+}
+# Length of the datetime prefix that identifies each rollup bucket
+PORTFOLIO_RESOLUTIONS = {"minute": 16, "hour": 13, "day": 10}
+STATEMENT_CACHE_SIZE = 256
 
+_local = threading.local()
+# Legacy accounts rows that have no account in the normalized tables yet
+_NOT_MIGRATED = 'lower(name) NOT IN (SELECT name FROM account_info)'
 
-with sqlite3.connect(DB) as conn:
-    cursor = conn.cursor()
-    cursor.execute('CREATE TABLE IF NOT EXISTS accounts (name TEXT PRIMARY KEY, account TEXT)')
-    cursor.execute('''
+
+def _add_missing_columns(conn: sqlite3.Connection, table: str, columns: dict[str, str]) -> None:
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    for column, declaration in columns.items():
+        if column not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+
+
+def _init_schema(conn: sqlite3.Connection) -> None:
+    # Legacy storage: one JSON blob per account. Only read by migrate_legacy_accounts(), when a connection is opened
+    conn.execute('CREATE TABLE IF NOT EXISTS accounts (name TEXT PRIMARY KEY, account TEXT)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS account_info (
+            name TEXT PRIMARY KEY,
+            balance REAL NOT NULL,
+            strategy TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS holdings (
+            name TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            PRIMARY KEY (name, symbol)
+        )
+    ''')
+    # Running aggregates maintained by Account; NULL until they have been computed
+    _add_missing_columns(conn, "account_info", {"total_invested": "REAL", "realized_pnl": "REAL"})
+    _add_missing_columns(conn, "holdings", {"cost_basis": "REAL"})
+    # Bumped on every write, so readers can tell cheaply whether an account has changed
+    _add_missing_columns(conn, "account_info", {"version": "INTEGER NOT NULL DEFAULT 0"})
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            price REAL NOT NULL,
+            timestamp TEXT NOT NULL,
+            rationale TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_transactions_name ON transactions (name, id)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS portfolio_values (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            datetime TEXT NOT NULL,
+            value REAL NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_portfolio_values_name ON portfolio_values (name, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_portfolio_values_name_datetime ON portfolio_values (name, datetime)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS portfolio_rollups (
+            name TEXT NOT NULL,
+            resolution TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            start TEXT NOT NULL,
+            datetime TEXT NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (name, resolution, bucket)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
         CREATE TABLE IF NOT EXISTS logs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT,
@@ -20,27 +105,321 @@ with sqlite3.connect(DB) as conn:
             message TEXT
         )
     ''')
-    cursor.execute('CREATE TABLE IF NOT EXISTS market (date TEXT PRIMARY KEY, data TEXT)')
-    conn.commit()
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_name_datetime ON logs (name, datetime)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_logs_name_id ON logs (name, id)')
+    # Daily counts of log entries that compact_logs() removed from the logs table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS log_rollups (
+            name TEXT NOT NULL,
+            day TEXT NOT NULL,
+            type TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (name, day, type)
+        )
+    ''')
+    # Legacy storage: one JSON blob per day. Only read by migrate_legacy_market()
+    conn.execute('CREATE TABLE IF NOT EXISTS market (date TEXT PRIMARY KEY, data TEXT)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS market_prices (
+            date TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            price REAL NOT NULL,
+            PRIMARY KEY (date, symbol)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_market_prices_symbol ON market_prices (symbol, date)')
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Return this thread's connection to the database, opening it on first use.
+    Connections run in WAL mode with synchronous=NORMAL, so readers never block the
+    writer and a commit does not fsync, and keep a cache of prepared statements.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(
+            DB,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        _init_schema(conn)
+        _local.conn = conn
+        _local.depth = 0
+        if conn.execute(f'SELECT 1 FROM accounts WHERE {_NOT_MIGRATED} LIMIT 1').fetchone():
+            migrate_legacy_accounts()
+    return conn
+
+
+def close_connection() -> None:
+    """Close this thread's connection, if it has one."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+def use_database(path: str) -> None:
+    """
+    Point the whole process at another database file. Only connections opened from now on use it:
+    this thread's connection is closed, so its next call opens one there, but other threads keep
+    the connections they already have to the old file until they close them.
+    """
+    global DB
+    close_connection()
+    DB = path
+
+
+@contextmanager
+def transaction(immediate: bool = True):
+    """
+    Run the enclosed statements in one transaction on this thread's connection.
+    Nested uses join the outermost transaction, which commits or rolls back.
+    Write transactions take the write lock up front (BEGIN IMMEDIATE) so they wait
+    on busy_timeout instead of failing when they later upgrade from a read.
+    """
+    conn = get_connection()
+    if _local.depth == 0:
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    _local.depth += 1
+    try:
+        yield conn.cursor()
+    except BaseException:
+        _local.depth -= 1
+        if _local.depth == 0:
+            conn.execute("ROLLBACK")
+        raise
+    _local.depth -= 1
+    if _local.depth == 0:
+        conn.execute("COMMIT")
+
+
+def _roll_up(cursor, points: list) -> None:
+    """
+    Fold (name, datetime, value) points, oldest first for each name, into the minute, hour and day rollups.
+    Consecutive points in the same bucket are combined before they reach SQLite.
+    """
+    rows = []
+    for resolution, length in PORTFOLIO_RESOLUTIONS.items():
+        key = row = None
+        for name, timestamp, value in points:
+            if key != (name, timestamp[:length]):
+                key = (name, timestamp[:length])
+                row = [name, resolution, key[1], timestamp, timestamp, value, value, value, 1]
+                rows.append(row)
+                continue
+            row[4] = timestamp
+            row[5] = max(row[5], value)
+            row[6] = min(row[6], value)
+            row[7] = value
+            row[8] += 1
+    cursor.executemany('''
+        INSERT INTO portfolio_rollups (name, resolution, bucket, start, datetime, high, low, close, count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(name, resolution, bucket) DO UPDATE SET
+            datetime=excluded.datetime,
+            high=max(high, excluded.high),
+            low=min(low, excluded.low),
+            close=excluded.close,
+            count=count + excluded.count
+    ''', rows)
+
+
+def _update_account(cursor, name: str, account_dict: dict, transactions: list, portfolio_values: list) -> None:
+    cursor.execute('''
+        INSERT INTO account_info (name, balance, strategy, total_invested, realized_pnl)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET
+            balance=excluded.balance,
+            strategy=excluded.strategy,
+            total_invested=excluded.total_invested,
+            realized_pnl=excluded.realized_pnl,
+            version=account_info.version + 1
+    ''', (
+        name,
+        account_dict["balance"],
+        account_dict["strategy"],
+        account_dict.get("total_invested"),
+        account_dict.get("realized_pnl"),
+    ))
+    cost_basis = account_dict.get("cost_basis", {})
+    cursor.execute('DELETE FROM holdings WHERE name = ?', (name,))
+    cursor.executemany(
+        'INSERT INTO holdings (name, symbol, quantity, cost_basis) VALUES (?, ?, ?, ?)',
+        [(name, symbol, quantity, cost_basis.get(symbol)) for symbol, quantity in account_dict["holdings"].items()],
+    )
+    cursor.executemany(
+        'INSERT INTO transactions (name, symbol, quantity, price, timestamp, rationale) VALUES (?, ?, ?, ?, ?, ?)',
+        [(name, t["symbol"], t["quantity"], t["price"], t["timestamp"], t["rationale"]) for t in transactions],
+    )
+    points = [(name, timestamp, value) for timestamp, value in portfolio_values]
+    cursor.executemany('INSERT INTO portfolio_values (name, datetime, value) VALUES (?, ?, ?)', points)
+    _roll_up(cursor, points)
+
+
+def update_account(name: str, account_dict: dict, transactions: list = (), portfolio_values: list = ()) -> None:
+    """
+    Save the balance, strategy, holdings and aggregates of an account, and append new transactions
+    and portfolio values to its history. Nothing already stored is read or rewritten, so the cost
+    does not grow with the age of the account.
+
+    Args:
+        name (str): The account name
+        account_dict (dict): The account's fields; its transactions and portfolio values are ignored
+        transactions (list): Transaction dicts to append, oldest first
+        portfolio_values (list): (datetime, value) points to append, oldest first
+    """
+    with transaction() as cursor:
+        _update_account(cursor, name.lower(), account_dict, list(transactions), list(portfolio_values))
+
 
 def write_account(name, account_dict):
-    json_data = json.dumps(account_dict)
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO accounts (name, account)
-            VALUES (?, ?)
-            ON CONFLICT(name) DO UPDATE SET account=excluded.account
-        ''', (name.lower(), json_data))
-        conn.commit()
+    """Write an account, replacing anything stored for it, including its history."""
+    write_accounts({name: account_dict})
+
+def write_accounts(accounts: dict[str, dict]) -> None:
+    """
+    Write many accounts at once, replacing anything stored for them, in one transaction
+    with one executemany per table. Used to create and reset traders and to seed test datasets.
+    """
+    names = [(name.lower(),) for name in accounts]
+    accounts = {name.lower(): account for name, account in accounts.items()}
+    with transaction() as cursor:
+        for table in ("holdings", "transactions", "portfolio_values", "portfolio_rollups"):
+            cursor.executemany(f'DELETE FROM {table} WHERE name = ?', names)
+        cursor.executemany('''
+            INSERT INTO account_info (name, balance, strategy, total_invested, realized_pnl)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                balance=excluded.balance,
+                strategy=excluded.strategy,
+                total_invested=excluded.total_invested,
+                realized_pnl=excluded.realized_pnl,
+                version=account_info.version + 1
+        ''', [
+            (name, a["balance"], a["strategy"], a.get("total_invested"), a.get("realized_pnl"))
+            for name, a in accounts.items()
+        ])
+        cursor.executemany(
+            'INSERT INTO holdings (name, symbol, quantity, cost_basis) VALUES (?, ?, ?, ?)',
+            [
+                (name, symbol, quantity, a.get("cost_basis", {}).get(symbol))
+                for name, a in accounts.items()
+                for symbol, quantity in a["holdings"].items()
+            ],
+        )
+        cursor.executemany(
+            'INSERT INTO transactions (name, symbol, quantity, price, timestamp, rationale) VALUES (?, ?, ?, ?, ?, ?)',
+            [
+                (name, t["symbol"], t["quantity"], t["price"], t["timestamp"], t["rationale"])
+                for name, a in accounts.items()
+                for t in a["transactions"]
+            ],
+        )
+        points = [
+            (name, timestamp, value)
+            for name, a in accounts.items()
+            for timestamp, value in a["portfolio_value_time_series"]
+        ]
+        cursor.executemany('INSERT INTO portfolio_values (name, datetime, value) VALUES (?, ?, ?)', points)
+        _roll_up(cursor, points)
+
+def read_account_version(name: str) -> int | None:
+    """Return the account's write counter, or None if there is no such account."""
+    with transaction(immediate=False) as cursor:
+        cursor.execute('SELECT version FROM account_info WHERE name = ?', (name.lower(),))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+def read_last_transaction_id(name: str) -> int | None:
+    """Return the id of the account's latest transaction, or None if it has none; ids only ever grow."""
+    with transaction(immediate=False) as cursor:
+        cursor.execute('SELECT MAX(id) FROM transactions WHERE name = ?', (name.lower(),))
+        return cursor.fetchone()[0]
+
+def read_holdings(name: str) -> dict[str, int]:
+    """Return the account's holdings, without loading anything else."""
+    with transaction(immediate=False) as cursor:
+        cursor.execute('SELECT symbol, quantity FROM holdings WHERE name = ?', (name.lower(),))
+        return dict(cursor.fetchall())
+
+def _read_transactions(cursor, name: str, limit: int | None) -> list[dict]:
+    cursor.execute('''
+        SELECT symbol, quantity, price, timestamp, rationale FROM (
+            SELECT id, symbol, quantity, price, timestamp, rationale FROM transactions
+            WHERE name = ? ORDER BY id DESC LIMIT ?
+        ) ORDER BY id
+    ''', (name, -1 if limit is None else limit))
+    return [
+        {"symbol": symbol, "quantity": quantity, "price": price, "timestamp": timestamp, "rationale": rationale}
+        for symbol, quantity, price, timestamp, rationale in cursor.fetchall()
+    ]
+
+def read_transactions(name: str, limit: int | None = None) -> list[dict]:
+    """Return the account's transactions, oldest first: all of them, or only the most recent limit."""
+    with transaction(immediate=False) as cursor:
+        return _read_transactions(cursor, name.lower(), limit)
 
 def read_account(name):
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT account FROM accounts WHERE name = ?', (name.lower(),))
+    """
+    Return an account's fields, with only its most recent TRANSACTION_WINDOW transactions and
+    PORTFOLIO_WINDOW portfolio values, so loading it costs the same however old it is.
+    """
+    name = name.lower()
+    with transaction(immediate=False) as cursor:
+        cursor.execute(
+            'SELECT balance, strategy, total_invested, realized_pnl FROM account_info WHERE name = ?', (name,)
+        )
         row = cursor.fetchone()
-        return json.loads(row[0]) if row else None
-    
+        if not row:
+            return None
+        balance, strategy, total_invested, realized_pnl = row
+        cursor.execute('SELECT symbol, quantity, cost_basis FROM holdings WHERE name = ?', (name,))
+        holdings, cost_basis = {}, {}
+        for symbol, quantity, cost in cursor.fetchall():
+            holdings[symbol] = quantity
+            cost_basis[symbol] = cost
+        transactions = _read_transactions(cursor, name, TRANSACTION_WINDOW)
+        cursor.execute('''
+            SELECT datetime, value FROM (
+                SELECT id, datetime, value FROM portfolio_values WHERE name = ? ORDER BY id DESC LIMIT ?
+            ) ORDER BY id
+        ''', (name, PORTFOLIO_WINDOW))
+        portfolio_value_time_series = [list(row) for row in cursor.fetchall()]
+        account = {
+            "name": name,
+            "balance": balance,
+            "strategy": strategy,
+            "holdings": holdings,
+            "transactions": transactions,
+            "portfolio_value_time_series": portfolio_value_time_series,
+        }
+        # Accounts written before the running aggregates existed are returned without them
+        if total_invested is not None and None not in cost_basis.values():
+            account.update(total_invested=total_invested, realized_pnl=realized_pnl, cost_basis=cost_basis)
+        return account
+
+def migrate_legacy_accounts() -> int:
+    """
+    Migration of accounts stored as JSON blobs in the legacy accounts table into the
+    normalized tables, run when a connection is opened and legacy rows are waiting.
+    Migrated rows are removed from the legacy table, so running it again is a no-op.
+    An account already in the normalized tables is never written over; its legacy row is left alone.
+
+    Returns:
+        int: The number of accounts migrated
+    """
+    with transaction() as cursor:
+        cursor.execute(f'SELECT name, account FROM accounts WHERE {_NOT_MIGRATED}')
+        legacy = cursor.fetchall()
+        write_accounts({name: json.loads(account) for name, account in legacy})
+        cursor.executemany('DELETE FROM accounts WHERE name = ?', [(name,) for name, _ in legacy])
+    return len(legacy)
+
 def write_log(name: str, type: str, message: str):
     """
     Write a log entry to the logs table.
@@ -52,13 +431,25 @@ def write_log(name: str, type: str, message: str):
     """
     now = datetime.now().isoformat()
     
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
+    with transaction() as cursor:
         cursor.execute('''
             INSERT INTO logs (name, datetime, type, message)
             VALUES (?, datetime('now'), ?, ?)
         ''', (name.lower(), type, message))
-        conn.commit()
+
+def write_logs(entries: list[tuple[str, str, str, str]]):
+    """
+    Write a batch of log entries to the logs table in a single transaction.
+
+    Args:
+        entries (list): Tuples of (name, datetime, type, message), with datetime
+            in the same UTC 'YYYY-MM-DD HH:MM:SS' form that write_log stores
+    """
+    with transaction() as cursor:
+        cursor.executemany('''
+            INSERT INTO logs (name, datetime, type, message)
+            VALUES (?, ?, ?, ?)
+        ''', [(name.lower(), when, type, message) for name, when, type, message in entries])
 
 def read_log(name: str, last_n=10):
     """
@@ -71,31 +462,249 @@ def read_log(name: str, last_n=10):
     Returns:
         list: A list of tuples containing (datetime, type, message)
     """
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
+    with transaction(immediate=False) as cursor:
         cursor.execute('''
             SELECT datetime, type, message FROM logs 
             WHERE name = ? 
-            ORDER BY datetime DESC
+            ORDER BY datetime DESC, id DESC
             LIMIT ?
         ''', (name.lower(), last_n))
         
         return reversed(cursor.fetchall())
 
-def write_market(date: str, data: dict) -> None:
-    data_json = json.dumps(data)
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
+def read_log_since(name: str, last_id: int = 0, limit: int = 100):
+    """
+    Read the log entries for a given name that were written after last_id.
+
+    Args:
+        name (str): The name to retrieve logs for
+        last_id (int): The id of the last entry already seen, or 0 for none
+        limit (int): Maximum number of entries; the most recent are kept
+
+    Returns:
+        list: A list of tuples containing (id, datetime, type, message), oldest first
+    """
+    with transaction(immediate=False) as cursor:
+        cursor.execute('''
+            SELECT id, datetime, type, message FROM logs
+            WHERE name = ? AND id > ?
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (name.lower(), last_id, limit))
+        return cursor.fetchall()[::-1]
+
+def read_logs_after(last_id: int, limit: int = 1000):
+    """
+    Read log entries for every name that were written after last_id.
+
+    Args:
+        last_id (int): The id of the last entry already seen
+        limit (int): Maximum number of entries to return
+
+    Returns:
+        list: A list of tuples containing (id, name, datetime, type, message), oldest first
+    """
+    with transaction(immediate=False) as cursor:
+        cursor.execute('''
+            SELECT id, name, datetime, type, message FROM logs
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (last_id, limit))
+        return cursor.fetchall()
+
+def last_log_id() -> int:
+    """Return the id of the most recent log entry, or 0 if there are none."""
+    with transaction(immediate=False) as cursor:
+        cursor.execute('SELECT MAX(id) FROM logs')
+        return cursor.fetchone()[0] or 0
+
+def data_version() -> int:
+    """Return a number that changes whenever another connection commits to the database."""
+    return get_connection().execute('PRAGMA data_version').fetchone()[0]
+
+def compact_logs(retention_days: int = LOG_RETENTION_DAYS) -> int:
+    """
+    Roll log entries older than the retention period up into daily counts per
+    name and type in log_rollups, and delete them from the logs table.
+
+    Args:
+        retention_days (int): Number of days of log entries to keep
+
+    Returns:
+        int: The number of log entries removed
+    """
+    cutoff = f"-{retention_days} days"
+    with transaction() as cursor:
+        cursor.execute('''
+            INSERT INTO log_rollups (name, day, type, count)
+            SELECT name, date(datetime), type, COUNT(*) FROM logs
+            WHERE datetime < datetime('now', ?)
+            GROUP BY name, date(datetime), type
+            ON CONFLICT(name, day, type) DO UPDATE SET count = count + excluded.count
+        ''', (cutoff,))
+        cursor.execute("DELETE FROM logs WHERE datetime < datetime('now', ?)", (cutoff,))
+        return cursor.rowcount
+
+def compact_portfolio_values(window: int = PORTFOLIO_WINDOW, retention_days: dict[str, int] = PORTFOLIO_RETENTION_DAYS) -> int:
+    """
+    Delete raw portfolio values past their retention, keeping each account's most recent window,
+    and minute and hour rollups past theirs. Day rollups are kept for good.
+
+    Returns:
+        int: The number of raw values removed
+    """
+    with transaction() as cursor:
         cursor.execute('''
-            INSERT INTO market (date, data)
-            VALUES (?, ?)
-            ON CONFLICT(date) DO UPDATE SET data=excluded.data
-        ''', (date, data_json))
-        conn.commit()
+            DELETE FROM portfolio_values
+            WHERE datetime < datetime('now', 'localtime', ?)
+            AND id NOT IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (PARTITION BY name ORDER BY id DESC) AS recent
+                    FROM portfolio_values
+                ) WHERE recent <= ?
+            )
+        ''', (f"-{retention_days['raw']} days", window))
+        removed = cursor.rowcount
+        for resolution in ("minute", "hour"):
+            cursor.execute(
+                "DELETE FROM portfolio_rollups WHERE resolution = ? AND datetime < datetime('now', 'localtime', ?)",
+                (resolution, f"-{retention_days[resolution]} days"),
+            )
+        return removed
+
+def read_portfolio_tier(name: str, resolution: str, since: str | None = None) -> list[tuple[str, float]]:
+    """
+    Return (datetime, value) points from the given day onwards, oldest first, from the raw
+    values or from the minute, hour or day rollups, where each bucket is its last value.
+    """
+    name = name.lower()
+    with transaction(immediate=False) as cursor:
+        if resolution == "raw":
+            cursor.execute('''
+                SELECT datetime, value FROM portfolio_values WHERE name = ? AND datetime >= ? ORDER BY datetime, id
+            ''', (name, since or ""))
+        else:
+            cursor.execute('''
+                SELECT datetime, close FROM portfolio_rollups
+                WHERE name = ? AND resolution = ? AND bucket >= ? ORDER BY bucket
+            ''', (name, resolution, since or ""))
+        return cursor.fetchall()
+
+def portfolio_tier_sizes(name: str, since: str | None = None) -> dict[str, tuple[int, int]]:
+    """
+    For each tier, the number of points it has from the given day onwards and how many raw
+    values those points cover. A tier holds the full history if it covers as many values as
+    the day rollups, which are never pruned.
+    """
+    name = name.lower()
+    sizes = {}
+    with transaction(immediate=False) as cursor:
+        cursor.execute('SELECT COUNT(*) FROM portfolio_values WHERE name = ? AND datetime >= ?', (name, since or ""))
+        points = cursor.fetchone()[0]
+        sizes["raw"] = (points, points)
+        cursor.execute('''
+            SELECT resolution, COUNT(*), SUM(count) FROM portfolio_rollups
+            WHERE name = ? AND bucket >= ? GROUP BY resolution
+        ''', (name, since or ""))
+        rollups = {resolution: (points, covered) for resolution, points, covered in cursor.fetchall()}
+        for resolution in PORTFOLIO_RESOLUTIONS:
+            sizes[resolution] = rollups.get(resolution, (0, 0))
+    return sizes
+
+def backfill_portfolio_rollups() -> int:
+    """Build rollups for accounts whose portfolio values were stored before rollups existed; return how many"""
+    with transaction() as cursor:
+        cursor.execute('''
+            SELECT DISTINCT name FROM portfolio_values
+            WHERE name NOT IN (SELECT DISTINCT name FROM portfolio_rollups)
+        ''')
+        names = [row[0] for row in cursor.fetchall()]
+        for name in names:
+            cursor.execute('SELECT name, datetime, value FROM portfolio_values WHERE name = ? ORDER BY id', (name,))
+            _roll_up(cursor, cursor.fetchall())
+    return len(names)
+
+def write_market(date: str, data: dict) -> None:
+    """
+    Store the closing price of every symbol for a date, replacing anything stored for it.
+
+    Args:
+        date (str): The date, as YYYY-MM-DD
+        data (dict): Mapping of symbol to price
+    """
+    with transaction() as cursor:
+        cursor.execute('DELETE FROM market_prices WHERE date = ?', (date,))
+        cursor.executemany(
+            'INSERT INTO market_prices (date, symbol, price) VALUES (?, ?, ?)',
+            [(date, symbol, price) for symbol, price in data.items() if price is not None],
+        )
 
 def read_market(date: str) -> dict | None:
-    with sqlite3.connect(DB) as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT data FROM market WHERE date = ?', (date,))
-        row = cursor.fetchone()
-        return json.loads(row[0]) if row else None
\ No newline at end of file
+    with transaction(immediate=False) as cursor:
+        cursor.execute('SELECT symbol, price FROM market_prices WHERE date = ?', (date,))
+        rows = cursor.fetchall()
+        return dict(rows) if rows else None
+
+def has_market(date: str) -> bool:
+    with transaction(immediate=False) as cursor:
+        cursor.execute('SELECT 1 FROM market_prices WHERE date = ? LIMIT 1', (date,))
+        return cursor.fetchone() is not None
+
+def read_market_prices(date: str, symbols: list[str]) -> dict[str, float]:
+    """
+    Look up the stored prices of a few symbols for a date, without reading the rest of the day.
+
+    Returns:
+        dict: Mapping of symbol to price, for the symbols that were found
+    """
+    if not symbols:
+        return {}
+    with transaction(immediate=False) as cursor:
+        cursor.execute(
+            f'SELECT symbol, price FROM market_prices WHERE date = ? AND symbol IN ({", ".join("?" * len(symbols))})',
+            (date, *symbols),
+        )
+        return dict(cursor.fetchall())
+
+def read_market_price(date: str, symbol: str) -> float | None:
+    return read_market_prices(date, [symbol]).get(symbol)
+
+def market_dates(start: str | None = None, end: str | None = None) -> list[str]:
+    """Return the dates with stored prices between start and end inclusive, oldest first."""
+    with transaction(immediate=False) as cursor:
+        cursor.execute(
+            'SELECT DISTINCT date FROM market_prices WHERE date >= ? AND date <= ? ORDER BY date',
+            (start or "", end or "9999-12-31"),
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+def iter_market_history(start: str | None = None, end: str | None = None, symbols: list[str] | None = None):
+    """
+    Yield (date, {symbol: price}) for each stored date between start and end inclusive,
+    oldest first, loading one day at a time. With symbols, only those prices are read.
+    """
+    for date in market_dates(start, end):
+        yield date, read_market_prices(date, symbols) if symbols else read_market(date)
+
+def migrate_legacy_market() -> int:
+    """
+    One-shot migration of market snapshots stored as one JSON blob per date into the
+    market_prices table. Migrated rows are removed from the legacy table.
+
+    Returns:
+        int: The number of dates migrated
+    """
+    with transaction() as cursor:
+        cursor.execute('SELECT date, data FROM market')
+        legacy = cursor.fetchall()
+        for date, data in legacy:
+            write_market(date, json.loads(data))
+        cursor.execute('DELETE FROM market')
+    return len(legacy)
+
+
+if __name__ == "__main__":
+    print(f"Migrated {migrate_legacy_accounts()} accounts to the normalized schema")
+    print(f"Migrated {migrate_legacy_market()} days of market data to the market_prices table")
+    print(f"Built portfolio value rollups for {backfill_portfolio_rollups()} accounts")
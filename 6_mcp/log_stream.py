@@ -0,0 +1,100 @@
+import asyncio
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from database import close_connection, data_version, last_log_id, read_log_since, read_logs_after
+
+load_dotenv(override=True)
+
+LOG_WATCH_INTERVAL_SECONDS = float(os.getenv("LOG_WATCH_INTERVAL_SECONDS", "0.25"))
+
+
+class LogBroadcaster:
+    """
+    In-process pub/sub channel for new log rows.
+    Traders write logs from another process, so a single watcher thread notices their
+    commits through SQLite's data_version, reads only the new rows once, and publishes
+    them to every subscriber of that name. While nothing is written the watcher's only work
+    is one PRAGMA data_version every interval, however many panels are open; it never reads
+    the logs table then, and it stops altogether when there are no subscribers. Errors reading
+    the database are printed and the watcher carries on at the next interval.
+    """
+
+    def __init__(self, interval: float = LOG_WATCH_INTERVAL_SECONDS):
+        self.interval = interval
+        self.subscribers: dict[str, list[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def publish(self, rows: list[tuple]) -> None:
+        """Deliver rows of (id, name, datetime, type, message) to the subscribers of each name"""
+        by_name: dict[str, list[tuple]] = {}
+        for log_id, name, timestamp, type, message in rows:
+            by_name.setdefault(name, []).append((log_id, timestamp, type, message))
+        with self.lock:
+            targets = [
+                (loop, queue, by_name[name])
+                for name in by_name
+                for loop, queue in self.subscribers.get(name, [])
+            ]
+        for loop, queue, name_rows in targets:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, name_rows)
+            except RuntimeError:
+                pass  # the subscriber's event loop has closed
+
+    async def subscribe(self, name: str, backlog: int = 0):
+        """
+        Yield lists of (id, datetime, type, message) for the given name as they are
+        written, starting with up to backlog of the most recent existing entries.
+        """
+        name = name.lower()
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self.lock:
+            self.subscribers.setdefault(name, []).append(subscriber)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._watch, name="log-watcher", daemon=True)
+                self.thread.start()
+        try:
+            rows = await asyncio.to_thread(read_log_since, name, 0, backlog) if backlog else []
+            last_id = rows[-1][0] if rows else 0
+            if rows:
+                yield rows
+            while True:
+                rows = [row for row in await subscriber[1].get() if row[0] > last_id]
+                if rows:
+                    last_id = rows[-1][0]
+                    yield rows
+        finally:
+            with self.lock:
+                self.subscribers[name].remove(subscriber)
+                if not self.subscribers[name]:
+                    del self.subscribers[name]
+
+    def _watch(self) -> None:
+        last_id = version = None
+        while True:
+            with self.lock:
+                if not self.subscribers:
+                    self.thread = None
+                    return
+            try:
+                if last_id is None:
+                    last_id, version = last_log_id(), data_version()
+                current = data_version()
+                if current != version:
+                    while rows := read_logs_after(last_id):
+                        last_id = rows[-1][0]
+                        self.publish(rows)
+                    version = current
+            except Exception as e:
+                # Keep watching, or the subscribers would wait forever. The next interval reopens the
+                # connection, whose data_version starts afresh, so it reads whatever was missed regardless
+                print(f"Log watcher could not read new logs: {e}")
+                close_connection()
+                version = None
+            time.sleep(self.interval)
+
+
+broadcaster = LogBroadcaster()
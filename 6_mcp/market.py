@@ -1,10 +1,15 @@
 from polygon import RESTClient
 from dotenv import load_dotenv
+import asyncio
 import os
 from datetime import datetime
 import random
-from database import write_market, read_market
+import time
+from database import write_market, has_market, read_market_prices
+from price_cache import PriceCache
+from market_calendar import calendar
 from functools import lru_cache
+from typing import Callable
 from datetime import timezone
 
 load_dotenv(override=True)
@@ -14,12 +19,46 @@ polygon_plan = os.getenv("POLYGON_PLAN")
 
 is_paid_polygon = polygon_plan == "paid"
 is_realtime_polygon = polygon_plan == "realtime"
+is_live_polygon = is_paid_polygon or is_realtime_polygon
+
+# How long a live price is reused before asking Polygon again; end of day prices are read from the database
+DEFAULT_PRICE_TTL_SECONDS = 1.0 if is_realtime_polygon else 60.0
+PRICE_TTL_SECONDS = float(os.getenv("PRICE_CACHE_TTL_SECONDS", DEFAULT_PRICE_TTL_SECONDS))
+price_cache = PriceCache(ttl=PRICE_TTL_SECONDS)
+
+# Market hours come from the offline calendar; optionally confirm with Polygon to catch unscheduled closures
+CONFIRM_MARKET_STATUS_WITH_POLYGON = (
+    os.getenv("CONFIRM_MARKET_STATUS_WITH_POLYGON", "false").strip().lower() == "true"
+)
+MARKET_STATUS_TTL_SECONDS = float(os.getenv("MARKET_STATUS_TTL_SECONDS", "300"))
+_polygon_status: tuple[bool, float] | None = None
+
+# End of day prices already read from the database, for one day; they only change with the next day's snapshot
+_eod_prices: tuple[str, dict[str, float]] = ("", {})
+
+# When set, every price lookup is answered from here instead, e.g. by backtest.py replaying history
+price_source: Callable[[list[str]], dict[str, float]] | None = None
+
+
+def get_market_status_polygon() -> bool:
+    """Polygon's view of whether the market is open, reused for MARKET_STATUS_TTL_SECONDS"""
+    global _polygon_status
+    if _polygon_status is None or _polygon_status[1] <= time.monotonic():
+        client = RESTClient(polygon_api_key)
+        market_status = client.get_market_status()
+        _polygon_status = (market_status.market == "open", time.monotonic() + MARKET_STATUS_TTL_SECONDS)
+    return _polygon_status[0]
 
 
 def is_market_open() -> bool:
-    client = RESTClient(polygon_api_key)
-    market_status = client.get_market_status()
-    return market_status.market == "open"
+    if not calendar.is_open():
+        return False
+    if CONFIRM_MARKET_STATUS_WITH_POLYGON and polygon_api_key:
+        try:
+            return get_market_status_polygon()
+        except Exception as e:
+            print(f"Could not confirm market status with Polygon, going by the calendar: {e}")
+    return True
 
 
 def get_all_share_prices_polygon_eod() -> dict[str, float]:
@@ -34,18 +73,15 @@ def get_all_share_prices_polygon_eod() -> dict[str, float]:
 
 
 @lru_cache(maxsize=2)
-def get_market_for_prior_date(today):
-    market_data = read_market(today)
-    if not market_data:
-        market_data = get_all_share_prices_polygon_eod()
-        write_market(today, market_data)
-    return market_data
+def ensure_market_for_prior_date(today) -> str:
+    """Fetch and store the prior close for every symbol, once per day"""
+    if not has_market(today):
+        write_market(today, get_all_share_prices_polygon_eod())
+    return today
 
 
 def get_share_price_polygon_eod(symbol) -> float:
-    today = datetime.now().date().strftime("%Y-%m-%d")
-    market_data = get_market_for_prior_date(today)
-    return market_data.get(symbol, 0.0)
+    return get_share_prices_polygon_eod([symbol])[symbol]
 
 
 def get_share_price_polygon_min(symbol) -> float:
@@ -55,16 +91,86 @@ def get_share_price_polygon_min(symbol) -> float:
 
 
 def get_share_price_polygon(symbol) -> float:
-    if is_paid_polygon:
-        return get_share_price_polygon_min(symbol)
+    if is_live_polygon:
+        return price_cache.get(symbol, get_share_price_polygon_min)
     else:
         return get_share_price_polygon_eod(symbol)
 
 
 def get_share_price(symbol) -> float:
+    if price_source:
+        return price_source([symbol])[symbol]
     if polygon_api_key:
         try:
             return get_share_price_polygon(symbol)
         except Exception as e:
             print(f"Was not able to use the polygon API due to {e}; using a random number")
     return float(random.randint(1, 100))
+
+
+def get_share_prices_polygon_eod(symbols: list[str]) -> dict[str, float]:
+    """Symbols already looked up today are answered from memory; only new ones are read from the database"""
+    global _eod_prices
+    today = ensure_market_for_prior_date(datetime.now().date().strftime("%Y-%m-%d"))
+    day, known = _eod_prices
+    if day != today:
+        day, known = today, {}
+        _eod_prices = (day, known)
+    missing = [symbol for symbol in symbols if symbol not in known]
+    if missing:
+        prices = read_market_prices(today, missing)
+        known.update({symbol: prices.get(symbol, 0.0) for symbol in missing})
+    return {symbol: known[symbol] for symbol in symbols}
+
+
+def get_share_prices_polygon_min(symbols: list[str]) -> dict[str, float]:
+    """One snapshot request for all the symbols, rather than one request per symbol"""
+    client = RESTClient(polygon_api_key)
+    results = client.get_snapshot_all("stocks", tickers=symbols)
+    prices = {
+        result.ticker: (result.min.close if result.min else None) or result.prev_day.close
+        for result in results
+    }
+    return {symbol: prices.get(symbol) or 0.0 for symbol in symbols}
+
+
+def get_share_prices_polygon(symbols: list[str]) -> dict[str, float]:
+    if is_live_polygon:
+        return price_cache.get_many(symbols, get_share_prices_polygon_min)
+    else:
+        return get_share_prices_polygon_eod(symbols)
+
+
+def get_share_prices(symbols: list[str]) -> dict[str, float]:
+    if not symbols:
+        return {}
+    if price_source:
+        return price_source(symbols)
+    if polygon_api_key:
+        try:
+            return get_share_prices_polygon(symbols)
+        except Exception as e:
+            print(f"Was not able to use the polygon API due to {e}; using random numbers")
+    return {symbol: float(random.randint(1, 100)) for symbol in symbols}
+
+
+async def get_share_price_async(symbol) -> float:
+    """As get_share_price, but cached live prices are returned without leaving the event loop"""
+    if polygon_api_key and is_live_polygon and not price_source:
+        try:
+            return await price_cache.get_async(symbol, get_share_price_polygon_min)
+        except Exception as e:
+            print(f"Was not able to use the polygon API due to {e}; using a random number")
+            return float(random.randint(1, 100))
+    return await asyncio.to_thread(get_share_price, symbol)
+
+
+async def get_share_prices_async(symbols: list[str]) -> dict[str, float]:
+    """As get_share_prices, but cached live prices are returned without leaving the event loop"""
+    if symbols and polygon_api_key and is_live_polygon and not price_source:
+        try:
+            return await price_cache.get_many_async(symbols, get_share_prices_polygon_min)
+        except Exception as e:
+            print(f"Was not able to use the polygon API due to {e}; using random numbers")
+            return {symbol: float(random.randint(1, 100)) for symbol in symbols}
+    return await asyncio.to_thread(get_share_prices, symbols)
@@ -0,0 +1,120 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+EXCHANGE_TIMEZONE = ZoneInfo("America/New_York")
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+
+def easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+
+def nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """The nth (1-based) given weekday of a month, or the last one when n is -1"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def observed(day: date) -> date | None:
+    """Saturday holidays are observed on the Friday before and Sunday ones on the Monday after"""
+    if day.weekday() == 5:
+        friday = day - timedelta(days=1)
+        # The exchange doesn't close on Dec 31 for a New Year's Day that falls on a Saturday
+        return None if (friday.month, friday.day) == (12, 31) else friday
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=16)
+def holidays(year: int) -> frozenset[date]:
+    """Full-day NYSE closures for the year, from the exchange's standing holiday rules"""
+    days = [
+        observed(date(year, 1, 1)),
+        nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        easter(year) - timedelta(days=2),  # Good Friday
+        nth_weekday(year, 5, 0, -1),  # Memorial Day
+        observed(date(year, 6, 19)) if year >= 2022 else None,  # Juneteenth
+        observed(date(year, 7, 4)),
+        nth_weekday(year, 9, 0, 1),  # Labor Day
+        nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        observed(date(year, 12, 25)),
+    ]
+    return frozenset(day for day in days if day)
+
+
+@lru_cache(maxsize=16)
+def early_closes(year: int) -> frozenset[date]:
+    """Days the exchange closes at 1pm: the eve of Independence Day, the day after Thanksgiving and Christmas Eve"""
+    candidates = [
+        date(year, 7, 3),
+        nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+        date(year, 12, 24),
+    ]
+    return frozenset(day for day in candidates if day.weekday() < 5 and day not in holidays(year))
+
+
+class MarketCalendar:
+    """Regular NYSE trading sessions, worked out offline from exchange hours and holiday rules"""
+
+    def __init__(self, timezone: ZoneInfo = EXCHANGE_TIMEZONE):
+        self.timezone = timezone
+
+    def now(self) -> datetime:
+        return datetime.now(self.timezone)
+
+    def session(self, day: date) -> tuple[datetime, datetime] | None:
+        """The open and close of the trading session on the given day, or None if the market is closed all day"""
+        if day.weekday() >= 5 or day in holidays(day.year):
+            return None
+        close = EARLY_CLOSE if day in early_closes(day.year) else REGULAR_CLOSE
+        return (
+            datetime.combine(day, REGULAR_OPEN, self.timezone),
+            datetime.combine(day, close, self.timezone),
+        )
+
+    def is_open(self, at: datetime | None = None) -> bool:
+        at = (at or self.now()).astimezone(self.timezone)
+        session = self.session(at.date())
+        return session is not None and session[0] <= at < session[1]
+
+    def next_open(self, at: datetime | None = None) -> datetime:
+        """The start of the next session; the current time if the market is open now"""
+        at = (at or self.now()).astimezone(self.timezone)
+        if self.is_open(at):
+            return at
+        day = at.date()
+        while True:
+            session = self.session(day)
+            if session and session[0] >= at:
+                return session[0]
+            day += timedelta(days=1)
+
+    def next_close(self, at: datetime | None = None) -> datetime:
+        at = (at or self.now()).astimezone(self.timezone)
+        return self.session(self.next_open(at).date())[1]
+
+    def seconds_until_open(self, at: datetime | None = None) -> float:
+        at = (at or self.now()).astimezone(self.timezone)
+        return (self.next_open(at) - at).total_seconds()
+
+
+calendar = MarketCalendar()
@@ -1,5 +1,5 @@
 from mcp.server.fastmcp import FastMCP
-from market import get_share_price
+from market import get_share_price_async, get_share_prices_async
 
 mcp = FastMCP("market_server")
 
@@ -10,7 +10,16 @@ async def lookup_share_price(symbol: str) -> float:
     Args:
         symbol: the symbol of the stock
     """
-    return get_share_price(symbol)
+    return await get_share_price_async(symbol)
+
+@mcp.tool()
+async def lookup_share_prices(symbols: list[str]) -> dict[str, float]:
+    """This tool provides the current prices of several stock symbols in a single lookup.
+
+    Args:
+        symbols: the symbols of the stocks
+    """
+    return await get_share_prices_async(symbols)
 
 if __name__ == "__main__":
     mcp.run(transport='stdio')
\ No newline at end of file
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import time
+from agents.mcp import MCPServerStdio
+from mcp_params import trader_mcp_server_params, researcher_mcp_server_params
+
+CLIENT_SESSION_TIMEOUT_SECONDS = 120
+HEALTH_CHECK_TIMEOUT_SECONDS = 10
+
+
+class PooledServer:
+    """
+    One long-lived MCP server. It is connected and cleaned up from its own task, because
+    the stdio transport must be closed by the same task that opened it.
+    """
+
+    def __init__(self, params: dict):
+        self.params = params
+        self.server = None
+        self.startup_seconds = 0.0
+        self.task = None
+        self.stop = asyncio.Event()
+
+    async def start(self) -> None:
+        ready = asyncio.get_running_loop().create_future()
+        self.task = asyncio.create_task(self._serve(ready))
+        await ready
+
+    async def _serve(self, ready: asyncio.Future) -> None:
+        start = time.monotonic()
+        server = MCPServerStdio(
+            self.params, client_session_timeout_seconds=CLIENT_SESSION_TIMEOUT_SECONDS, cache_tools_list=True
+        )
+        try:
+            await server.connect()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+            await server.cleanup()
+            return
+        self.server = server
+        self.startup_seconds = time.monotonic() - start
+        ready.set_result(None)
+        try:
+            await self.stop.wait()
+        finally:
+            await server.cleanup()
+
+    async def is_healthy(self) -> bool:
+        if self.task is None or self.task.done() or not self.server or not self.server.session:
+            return False
+        try:
+            await asyncio.wait_for(self.server.session.send_ping(), HEALTH_CHECK_TIMEOUT_SECONDS)
+            return True
+        except Exception:
+            return False
+
+    async def close(self) -> None:
+        self.stop.set()
+        if self.task:
+            await asyncio.gather(self.task, return_exceptions=True)
+
+
+class MCPServerPool:
+    """
+    MCP servers started once and kept running across trading cycles.
+    Servers are keyed by their launch parameters, so servers that don't depend on the
+    trader (accounts, push, market, fetch, search) are shared by everyone, while each
+    trader keeps its own memory server.
+    """
+
+    def __init__(self):
+        self.servers: dict[str, PooledServer] = {}
+        self.locks: dict[str, asyncio.Lock] = {}
+        self.started = 0
+        self.reused = 0
+        self.seconds_saved = 0.0
+
+    async def get(self, params: dict) -> MCPServerStdio:
+        key = json.dumps(params, sort_keys=True)
+        async with self.locks.setdefault(key, asyncio.Lock()):
+            pooled = self.servers.get(key)
+            if pooled:
+                self.reused += 1
+                self.seconds_saved += pooled.startup_seconds
+            else:
+                pooled = PooledServer(params)
+                await pooled.start()
+                self.servers[key] = pooled
+                self.started += 1
+            return pooled.server
+
+    async def trader_servers(self) -> list[MCPServerStdio]:
+        return list(await asyncio.gather(*[self.get(params) for params in trader_mcp_server_params]))
+
+    async def researcher_servers(self, name: str) -> list[MCPServerStdio]:
+        return list(
+            await asyncio.gather(*[self.get(params) for params in researcher_mcp_server_params(name)])
+        )
+
+    async def health_check(self) -> int:
+        """Restart any server that has died or stopped answering pings; return how many were restarted"""
+
+        async def check(key: str, pooled: PooledServer) -> bool:
+            if await pooled.is_healthy():
+                return False
+            print(f"Restarting MCP server: {pooled.params['command']} {' '.join(pooled.params['args'])}")
+            await pooled.close()
+            del self.servers[key]
+            try:
+                await self.get(pooled.params)
+            except Exception as e:
+                print(f"Could not restart MCP server, will try again when it is next needed: {e}")
+            return True
+
+        results = await asyncio.gather(*[check(key, pooled) for key, pooled in list(self.servers.items())])
+        return sum(results)
+
+    def start_cycle(self) -> None:
+        self.started = 0
+        self.reused = 0
+        self.seconds_saved = 0.0
+
+    def cycle_report(self) -> str:
+        return (
+            f"MCP server pool: {self.started} started, {self.reused} reused, "
+            f"~{self.seconds_saved:.1f}s of server startup saved this cycle"
+        )
+
+    async def close(self) -> None:
+        await asyncio.gather(*[pooled.close() for pooled in self.servers.values()])
+        self.servers.clear()
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+
+class PriceCache:
+    """
+    Shared cache of share prices that expire after a TTL.
+    Concurrent misses for the same symbol are coalesced: the first caller fetches the price
+    and everyone else asking for that symbol in the meantime waits for the same result.
+    Safe to use from threads (get, get_many) and from the event loop (get_async, get_many_async).
+    """
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.prices: dict[str, tuple[float, float]] = {}
+        self.inflight: dict[str, Future] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+    def clear(self) -> None:
+        with self.lock:
+            self.prices.clear()
+
+    def _claim(self, symbols: list[str]) -> tuple[dict[str, float], dict[str, Future], list[str]]:
+        """Split symbols into fresh prices, fetches already in flight, and symbols this caller must fetch"""
+        found, waiting, missing = {}, {}, []
+        now = self.clock()
+        with self.lock:
+            for symbol in dict.fromkeys(symbols):
+                entry = self.prices.get(symbol)
+                if entry and entry[1] > now:
+                    self.hits += 1
+                    found[symbol] = entry[0]
+                elif symbol in self.inflight:
+                    self.coalesced += 1
+                    waiting[symbol] = self.inflight[symbol]
+                else:
+                    self.misses += 1
+                    self.inflight[symbol] = Future()
+                    missing.append(symbol)
+        return found, waiting, missing
+
+    def _complete(self, missing: list[str], prices: dict[str, float]) -> dict[str, float]:
+        expires = self.clock() + self.ttl
+        fetched = {}
+        with self.lock:
+            for symbol in missing:
+                price = prices.get(symbol, 0.0)
+                self.prices[symbol] = (price, expires)
+                self.inflight.pop(symbol).set_result(price)
+                fetched[symbol] = price
+        return fetched
+
+    def _fail(self, missing: list[str], error: BaseException) -> None:
+        with self.lock:
+            for symbol in missing:
+                self.inflight.pop(symbol).set_exception(error)
+
+    def get_many(self, symbols: list[str], fetch: Callable[[list[str]], dict[str, float]]) -> dict[str, float]:
+        """Return prices for symbols, calling fetch once with the symbols that nobody else is fetching"""
+        found, waiting, missing = self._claim(symbols)
+        if missing:
+            try:
+                prices = fetch(missing)
+            except BaseException as e:
+                self._fail(missing, e)
+                raise
+            found.update(self._complete(missing, prices))
+        for symbol, future in waiting.items():
+            found[symbol] = future.result()
+        return found
+
+    def get(self, symbol: str, fetch: Callable[[str], float]) -> float:
+        return self.get_many([symbol], lambda symbols: {symbols[0]: fetch(symbols[0])})[symbol]
+
+    async def get_many_async(
+        self, symbols: list[str], fetch: Callable[[list[str]], dict[str, float]]
+    ) -> dict[str, float]:
+        """As get_many, but fetches in a worker thread and waits without blocking the event loop"""
+        found, waiting, missing = self._claim(symbols)
+        if missing:
+            try:
+                prices = await asyncio.to_thread(fetch, missing)
+            except BaseException as e:
+                self._fail(missing, e)
+                raise
+            found.update(self._complete(missing, prices))
+        for symbol, future in waiting.items():
+            found[symbol] = await asyncio.wrap_future(future)
+        return found
+
+    async def get_async(self, symbol: str, fetch: Callable[[str], float]) -> float:
+        prices = await self.get_many_async([symbol], lambda symbols: {symbols[0]: fetch(symbols[0])})
+        return prices[symbol]
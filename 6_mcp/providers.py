@@ -0,0 +1,280 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import AsyncIterator
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError
+from pydantic import BaseModel
+from agents import Model, OpenAIChatCompletionsModel, OpenAIResponsesModel
+import httpx
+
+load_dotenv(override=True)
+
+# Set by each trader run, so that queued model requests can be shared out fairly between traders
+current_trader: ContextVar[str] = ContextVar("current_trader", default="default")
+
+CHARS_PER_TOKEN = 4
+KEEPALIVE_EXPIRY_SECONDS = 60.0
+
+
+class ProviderConfig(BaseModel):
+    name: str
+    base_url: str | None
+    api_key_env: str
+    requests_per_minute: float
+    tokens_per_minute: float
+    max_connections: int
+    max_keepalive_connections: int
+
+    @classmethod
+    def from_env(cls, name: str, **defaults) -> "ProviderConfig":
+        """Defaults can be overridden with e.g. DEEPSEEK_REQUESTS_PER_MINUTE or GEMINI_MAX_CONNECTIONS"""
+        prefix = name.upper()
+        for field in ("requests_per_minute", "tokens_per_minute", "max_connections", "max_keepalive_connections"):
+            value = os.getenv(f"{prefix}_{field.upper()}")
+            if value:
+                defaults[field] = float(value)
+        return cls(name=name, **defaults)
+
+
+PROVIDERS = {
+    config.name: config
+    for config in (
+        ProviderConfig.from_env(
+            "openai", base_url=None, api_key_env="OPENAI_API_KEY",
+            requests_per_minute=500, tokens_per_minute=200_000, max_connections=50, max_keepalive_connections=20,
+        ),
+        ProviderConfig.from_env(
+            "openrouter", base_url="https://openrouter.ai/api/v1", api_key_env="OPENROUTER_API_KEY",
+            requests_per_minute=60, tokens_per_minute=200_000, max_connections=20, max_keepalive_connections=10,
+        ),
+        ProviderConfig.from_env(
+            "deepseek", base_url="https://api.deepseek.com/v1", api_key_env="DEEPSEEK_API_KEY",
+            requests_per_minute=60, tokens_per_minute=200_000, max_connections=20, max_keepalive_connections=10,
+        ),
+        ProviderConfig.from_env(
+            "gemini", base_url="https://generativelanguage.googleapis.com/v1beta/openai/", api_key_env="GOOGLE_API_KEY",
+            requests_per_minute=15, tokens_per_minute=1_000_000, max_connections=10, max_keepalive_connections=5,
+        ),
+    )
+}
+
+
+class TokenBucket:
+    """Refills continuously at rate_per_minute up to one minute's worth; the level may go negative on overspend"""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60
+        self.capacity = rate_per_minute
+        self.level = rate_per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (amounts above capacity only need a full bucket)"""
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+
+class ProviderLimiter:
+    """
+    Admits requests to one provider within its request and token budgets.
+    Waiting requests are queued per trader and admitted round robin across traders,
+    so one trader with a long queue can't starve the others.
+    Token use is estimated on admission and corrected once the response reports usage.
+    """
+
+    def __init__(self, config: ProviderConfig):
+        self.config = config
+        self.requests = TokenBucket(config.requests_per_minute)
+        self.tokens = TokenBucket(config.tokens_per_minute)
+        self.queues: dict[str, deque[tuple[asyncio.Future, float]]] = {}
+        self.turns: deque[str] = deque()
+        self.timer = None
+        self.admitted = 0
+        self.throttled = 0
+        self.rate_limited = 0
+        self.tokens_used = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "admitted": self.admitted,
+            "queued": sum(len(queue) for queue in self.queues.values()),
+            "throttled": self.throttled,
+            "rate_limited": self.rate_limited,
+            "tokens": self.tokens_used,
+            "avg_wait": self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+    async def acquire(self, trader: str, estimated_tokens: float) -> None:
+        future = asyncio.get_running_loop().create_future()
+        if trader not in self.queues:
+            self.queues[trader] = deque()
+            self.turns.append(trader)
+        self.queues[trader].append((future, estimated_tokens))
+        start = time.monotonic()
+        self._dispatch()
+        if not future.done():
+            self.throttled += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(estimated_tokens, 0)  # admitted just as we were cancelled
+            else:
+                self._forget(trader, future)
+            raise
+        waited = time.monotonic() - start
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def _forget(self, trader: str, future: asyncio.Future) -> None:
+        queue = self.queues.get(trader)
+        if queue:
+            self.queues[trader] = deque(entry for entry in queue if entry[0] is not future)
+            if not self.queues[trader]:
+                del self.queues[trader]
+                self.turns.remove(trader)
+
+    def _dispatch(self) -> None:
+        """Admit queued requests in round-robin order for as long as the budgets allow"""
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        while self.turns:
+            trader = self.turns[0]
+            future, estimated_tokens = self.queues[trader][0]
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+            if wait > 0:
+                self.timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            self.queues[trader].popleft()
+            self.turns.rotate(-1)
+            if not self.queues[trader]:
+                del self.queues[trader]
+                self.turns.remove(trader)
+            if future.done():
+                continue
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+            future.set_result(None)
+
+    def release(self, estimated_tokens: float, actual_tokens: float | None) -> None:
+        if actual_tokens is not None:
+            self.tokens.take(actual_tokens - estimated_tokens)
+            self.tokens_used += actual_tokens
+
+    def backoff(self) -> None:
+        """The provider returned 429 despite our budget: drain the request bucket so admissions drop to the sustained rate"""
+        self.rate_limited += 1
+        self.requests.level = min(self.requests.level, 0.0)
+
+
+def estimate_tokens(system_instructions: str | None, input) -> float:
+    text = input if isinstance(input, str) else json.dumps(input, default=str)
+    return (len(system_instructions or "") + len(text)) / CHARS_PER_TOKEN
+
+
+class RateLimitedModel(Model):
+    """Wraps a model so every call waits for its provider's limiter, attributed to the current trader"""
+
+    def __init__(self, model: Model, limiter: ProviderLimiter):
+        self.model = model
+        self.limiter = limiter
+
+    async def get_response(self, system_instructions, input, *args, **kwargs):
+        estimated = estimate_tokens(system_instructions, input)
+        await self.limiter.acquire(current_trader.get(), estimated)
+        usage = None
+        try:
+            response = await self.model.get_response(system_instructions, input, *args, **kwargs)
+            usage = response.usage.total_tokens
+            return response
+        except RateLimitError:
+            self.limiter.backoff()
+            raise
+        finally:
+            self.limiter.release(estimated, usage)
+
+    async def stream_response(self, system_instructions, input, *args, **kwargs) -> AsyncIterator:
+        estimated = estimate_tokens(system_instructions, input)
+        await self.limiter.acquire(current_trader.get(), estimated)
+        usage = None
+        try:
+            async for event in self.model.stream_response(system_instructions, input, *args, **kwargs):
+                if getattr(event, "type", None) == "response.completed" and event.response.usage:
+                    usage = event.response.usage.total_tokens
+                yield event
+        except RateLimitError:
+            self.limiter.backoff()
+            raise
+        finally:
+            self.limiter.release(estimated, usage)
+
+
+class ProviderRegistry:
+    """One AsyncOpenAI client, with a tuned keep-alive connection pool, and one limiter per provider"""
+
+    def __init__(self, providers: dict[str, ProviderConfig] = PROVIDERS):
+        self.providers = providers
+        self.clients: dict[str, AsyncOpenAI] = {}
+        self.limiters: dict[str, ProviderLimiter] = {}
+
+    def client(self, provider: str) -> AsyncOpenAI:
+        if provider not in self.clients:
+            config = self.providers[provider]
+            http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=config.max_connections,
+                    max_keepalive_connections=config.max_keepalive_connections,
+                    keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+                )
+            )
+            self.clients[provider] = AsyncOpenAI(
+                base_url=config.base_url, api_key=os.getenv(config.api_key_env), http_client=http_client
+            )
+        return self.clients[provider]
+
+    def limiter(self, provider: str) -> ProviderLimiter:
+        if provider not in self.limiters:
+            self.limiters[provider] = ProviderLimiter(self.providers[provider])
+        return self.limiters[provider]
+
+    def model(self, provider: str, model_name: str) -> RateLimitedModel:
+        client = self.client(provider)
+        if provider == "openai":
+            model = OpenAIResponsesModel(model=model_name, openai_client=client)
+        else:
+            model = OpenAIChatCompletionsModel(model=model_name, openai_client=client)
+        return RateLimitedModel(model, self.limiter(provider))
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        return {provider: limiter.stats() for provider, limiter in self.limiters.items()}
+
+    def report(self) -> str:
+        lines = []
+        for provider, stats in self.stats().items():
+            lines.append(
+                f"{provider}: {stats['admitted']} requests, {stats['tokens']:,} tokens, {stats['queued']} queued, "
+                f"{stats['throttled']} throttled (avg wait {stats['avg_wait']:.1f}s, max {stats['max_wait']:.1f}s), "
+                f"{stats['rate_limited']} rate limited by the provider"
+            )
+        return "\n".join(lines)
+
+
+registry = ProviderRegistry()
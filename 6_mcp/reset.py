@@ -40,10 +40,14 @@ You focus your trading on crypto ETFs.
 
 
 def reset_traders():
-    Account.get("Warren").reset(waren_strategy)
-    Account.get("George").reset(george_strategy)
-    Account.get("Ray").reset(ray_strategy)
-    Account.get("Cathie").reset(cathie_strategy)
+    Account.reset_all(
+        {
+            "Warren": waren_strategy,
+            "George": george_strategy,
+            "Ray": ray_strategy,
+            "Cathie": cathie_strategy,
+        }
+    )
 
 
 if __name__ == "__main__":
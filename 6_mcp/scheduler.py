@@ -0,0 +1,134 @@
+import asyncio
+import random
+import time
+from pydantic import BaseModel
+from typing import Awaitable, Callable
+
+Job = tuple[str, Callable[[], Awaitable[None]]]
+
+
+class CycleMetrics(BaseModel):
+    """What happened to the runs started at one tick"""
+
+    tick: int
+    runs: int = 0
+    completed: int = 0
+    failed: int = 0
+    timed_out: list[str] = []
+    queue_delays: list[float] = []
+    durations: list[float] = []
+    seconds: float = 0.0
+    skipped_ticks: int = 0
+
+    def report(self) -> str:
+        def summary(values: list[float]) -> str:
+            if not values:
+                return "n/a"
+            return f"avg {sum(values) / len(values):.1f}s max {max(values):.1f}s"
+
+        lines = [
+            f"Cycle {self.tick}: {self.completed}/{self.runs} runs completed, {self.failed} failed, "
+            f"{len(self.timed_out)} over deadline in {self.seconds:.1f}s",
+            f"  queueing delay {summary(self.queue_delays)}, run time {summary(self.durations)}",
+        ]
+        if self.timed_out:
+            lines.append(f"  cancelled at deadline: {', '.join(self.timed_out)}")
+        if self.skipped_ticks:
+            lines.append(f"  overran the interval, skipping {self.skipped_ticks} tick(s)")
+        return "\n".join(lines)
+
+
+class TraderScheduler:
+    """
+    Runs a set of jobs at fixed-rate ticks: tick k starts at start + k * interval however
+    long earlier cycles took, and ticks that a slow cycle runs past are skipped rather than
+    queued up. Within a tick each job starts after a random jitter, at most `concurrency`
+    run at once, and any still running at the deadline is cancelled.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        concurrency: int,
+        jitter: float = 0.0,
+        deadline: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.interval = interval
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.deadline = deadline
+        self.clock = clock
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.history: list[CycleMetrics] = []
+
+    async def _run_job(self, name: str, job: Callable[[], Awaitable[None]], metrics: CycleMetrics) -> None:
+        scheduled = self.clock() + random.uniform(0, self.jitter)
+        await asyncio.sleep(scheduled - self.clock())
+        async with self.semaphore:
+            started = self.clock()
+            metrics.queue_delays.append(started - scheduled)
+            try:
+                async with asyncio.timeout(self.deadline):
+                    await job()
+                metrics.completed += 1
+            except TimeoutError:
+                metrics.timed_out.append(name)
+            except Exception as e:
+                print(f"Error running {name}: {e}")
+                metrics.failed += 1
+            finally:
+                metrics.durations.append(self.clock() - started)
+
+    async def run_cycle(self, jobs: list[Job], tick: int = 0) -> CycleMetrics:
+        """Run every job once, respecting the jitter, concurrency cap and deadline"""
+        metrics = CycleMetrics(tick=tick, runs=len(jobs))
+        start = self.clock()
+        await asyncio.gather(*[self._run_job(name, job, metrics) for name, job in jobs])
+        metrics.seconds = self.clock() - start
+        return metrics
+
+    async def run_forever(
+        self,
+        make_jobs: Callable[[], list[Job]],
+        before_cycle: Callable[[], Awaitable[bool]] | None = None,
+        after_cycle: Callable[[CycleMetrics | None], Awaitable[None]] | None = None,
+        wait_until_ready: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        """
+        Run a cycle at every tick. before_cycle returns False to skip a tick (e.g. the market is
+        closed); after_cycle is called after every tick, with the metrics if a cycle ran.
+        If wait_until_ready is given, a skipped tick waits on it instead of the next tick, and
+        the ticks are then realigned so that the next cycle starts as soon as it returns.
+        """
+        start = self.clock()
+        tick = 0
+        while True:
+            metrics = None
+            if before_cycle is None or await before_cycle():
+                metrics = await self.run_cycle(make_jobs(), tick)
+            elif wait_until_ready:
+                if after_cycle:
+                    await after_cycle(None)
+                await wait_until_ready()
+                start = self.clock() - tick * self.interval
+                continue
+            next_tick = max(tick + 1, int((self.clock() - start) / self.interval) + 1)
+            if metrics:
+                metrics.skipped_ticks = next_tick - tick - 1
+                self.history.append(metrics)
+            if after_cycle:
+                await after_cycle(metrics)
+            tick = next_tick
+            await asyncio.sleep(max(0.0, start + tick * self.interval - self.clock()))
+
+    def totals(self) -> dict[str, float]:
+        delays = [delay for cycle in self.history for delay in cycle.queue_delays]
+        return {
+            "cycles": len(self.history),
+            "runs": sum(cycle.runs for cycle in self.history),
+            "timed_out": sum(len(cycle.timed_out) for cycle in self.history),
+            "failed": sum(cycle.failed for cycle in self.history),
+            "overruns": sum(1 for cycle in self.history if cycle.skipped_ticks),
+            "max_queue_delay": max(delays, default=0.0),
+        }
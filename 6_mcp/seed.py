@@ -0,0 +1,119 @@
+"""
+Seed an accounts database with synthetic accounts, for load tests and benchmarks.
+
+Every account gets a valid history: trades never oversell a holding or overdraw the balance,
+and the stored aggregates match a replay of the transactions, as check_aggregates expects.
+All accounts are written with database.write_accounts, in one transaction.
+
+    uv run seed.py --accounts 1000 --transactions 200
+    uv run seed.py --database /tmp/load.db --accounts 50 --transactions 5000 --portfolio-values 2000
+    uv run seed.py --accounts 200 --transactions 100 --compare
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import database
+
+SYMBOLS = ["AAPL", "AMZN", "GOOG", "META", "MSFT", "NVDA", "TSLA", "SPY", "QQQ", "IBIT"]
+START = datetime(2024, 1, 2, 9, 30)
+
+
+def synthetic_account(name: str, transactions: int, portfolio_values: int, rng: random.Random) -> dict:
+    """An account dict, as read_account returns it, with a random but consistent trading history"""
+    from accounts import INITIAL_BALANCE, Transaction, aggregates_from_transactions
+
+    prices = {symbol: rng.uniform(20, 500) for symbol in SYMBOLS}
+    holdings: dict[str, int] = {}
+    balance = INITIAL_BALANCE
+    history = []
+    moment = START
+    for _ in range(transactions):
+        moment += timedelta(minutes=rng.randint(1, 30))
+        symbol = rng.choice(SYMBOLS)
+        prices[symbol] = round(prices[symbol] * rng.uniform(0.98, 1.02), 2)
+        price = prices[symbol]
+        affordable = int(balance // price)
+        if holdings and (rng.random() < 0.5 or not affordable):
+            symbol = rng.choice(sorted(holdings))
+            price = prices[symbol]
+            quantity = -rng.randint(1, holdings[symbol])
+        else:
+            quantity = rng.randint(1, min(affordable, 20))
+        balance -= quantity * price
+        holdings[symbol] = holdings.get(symbol, 0) + quantity
+        if not holdings[symbol]:
+            del holdings[symbol]
+        history.append(
+            Transaction(
+                symbol=symbol,
+                quantity=quantity,
+                price=price,
+                timestamp=moment.strftime("%Y-%m-%d %H:%M:%S"),
+                rationale="Seeded",
+            )
+        )
+    cost_basis, realized_pnl, total_invested = aggregates_from_transactions(history)
+    value = INITIAL_BALANCE
+    series = []
+    for i in range(portfolio_values):
+        value *= rng.uniform(0.995, 1.005)
+        series.append(((START + timedelta(minutes=15 * i)).strftime("%Y-%m-%d %H:%M:%S"), round(value, 2)))
+    return {
+        "name": name,
+        "balance": balance,
+        "strategy": f"You are {name}, a synthetic trader seeded for testing.",
+        "holdings": holdings,
+        "transactions": [transaction.model_dump() for transaction in history],
+        "portfolio_value_time_series": series,
+        "cost_basis": cost_basis,
+        "realized_pnl": realized_pnl,
+        "total_invested": total_invested,
+    }
+
+
+def synthetic_accounts(
+    count: int, transactions: int, portfolio_values: int = 0, prefix: str = "seed", seed: int = 0
+) -> dict[str, dict]:
+    rng = random.Random(seed)
+    names = [f"{prefix}{i:05d}" for i in range(count)]
+    return {name: synthetic_account(name, transactions, portfolio_values, rng) for name in names}
+
+
+def seed_accounts(accounts: dict[str, dict]) -> float:
+    """Write the accounts in bulk and return the time taken in seconds"""
+    start = time.perf_counter()
+    database.write_accounts(accounts)
+    return time.perf_counter() - start
+
+
+def seed_accounts_one_by_one(accounts: dict[str, dict]) -> float:
+    """The old path, one write_account transaction per account, for comparison"""
+    start = time.perf_counter()
+    for name, account in accounts.items():
+        database.write_account(name, account)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed an accounts database with synthetic accounts")
+    parser.add_argument("--database", help="the database to seed (default: ACCOUNTS_DB or accounts.db)")
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=100, help="transactions per account")
+    parser.add_argument("--portfolio-values", type=int, default=0, help="portfolio value points per account")
+    parser.add_argument("--prefix", default="seed", help="account names are the prefix and a number")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", action="store_true", help="also time writing the accounts one at a time")
+    args = parser.parse_args()
+
+    if args.database:
+        database.use_database(args.database)
+    accounts = synthetic_accounts(args.accounts, args.transactions, args.portfolio_values, args.prefix, args.seed)
+    rows = sum(len(account["transactions"]) + len(account["portfolio_value_time_series"]) for account in accounts.values())
+    if args.compare:
+        elapsed = seed_accounts_one_by_one(accounts)
+        print(f"One at a time: {len(accounts)} accounts, {rows:,} rows in {elapsed:.2f}s")
+    elapsed = seed_accounts(accounts)
+    print(f"Bulk: {len(accounts)} accounts, {rows:,} rows in {elapsed:.2f}s")
@@ -0,0 +1,54 @@
+import numpy as np
+from database import backfill_portfolio_rollups, portfolio_tier_sizes, read_portfolio_tier
+
+TIERS = ("raw", "minute", "hour", "day")
+
+
+def lttb(points: list[tuple[str, float]], threshold: int) -> list[tuple[str, float]]:
+    """
+    Largest-Triangle-Three-Buckets downsampling: keep the first and last points, and from each
+    bucket in between the point forming the largest triangle with its neighbours, which preserves
+    the peaks and troughs a chart needs far better than averaging or striding.
+    """
+    if threshold < 3 or len(points) <= threshold:
+        return points
+    x = np.array([timestamp.replace(" ", "T") for timestamp, _ in points], dtype="datetime64[s]").astype(float)
+    y = np.array([value for _, value in points], dtype=float)
+    edges = np.linspace(1, len(points) - 1, threshold - 1).astype(int)
+    chosen = [0]
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end : edges[i + 2]].mean(), y[end : edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        previous = chosen[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        chosen.append(start + int(areas.argmax()))
+    chosen.append(len(points) - 1)
+    return [points[i] for i in chosen]
+
+
+def choose_tier(sizes: dict[str, tuple[int, int]], max_points: int) -> str:
+    """
+    The coarsest tier that holds the whole history in at least max_points points, so that LTTB
+    has enough to choose from without reading more than it needs; with fewer points than that
+    anywhere, the finest tier that holds the whole history.
+    """
+    complete = [tier for tier in TIERS if sizes[tier][1] == sizes["day"][1]]
+    enough = [tier for tier in complete if sizes[tier][0] >= max_points]
+    return enough[-1] if enough else complete[0]
+
+
+def portfolio_series(name: str, max_points: int, since: str | None = None) -> list[tuple[str, float]]:
+    """
+    At most max_points (datetime, value) points of an account's portfolio value from the given
+    day onwards, read from the coarsest tier with enough detail and then downsampled with LTTB.
+    """
+    sizes = portfolio_tier_sizes(name, since)
+    if sizes["raw"][0] and not sizes["day"][0]:
+        backfill_portfolio_rollups()
+        sizes = portfolio_tier_sizes(name, since)
+    return lttb(read_portfolio_tier(name, choose_tier(sizes, max_points), since), max_points)
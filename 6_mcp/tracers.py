@@ -1,9 +1,18 @@
 from agents import TracingProcessor, Trace, Span
-from database import write_log
+from database import write_logs
+from datetime import datetime, timezone
+import atexit
+import queue
 import secrets
 import string
+import threading
+import time
 
 ALPHANUM = string.ascii_lowercase + string.digits 
+LOG_FLUSH_SIZE = 200
+LOG_FLUSH_INTERVAL_SECONDS = 0.5
+
+_FLUSH = object()
 
 def make_trace_id(tag: str) -> str:
     """
@@ -15,8 +24,96 @@ def make_trace_id(tag: str) -> str:
     random_suffix = ''.join(secrets.choice(ALPHANUM) for _ in range(pad_len))
     return f"trace_{tag}{random_suffix}"
 
+class LogBuffer:
+    """
+    Collects log entries in memory and writes them to the database in batches from a
+    background thread, so tracing callbacks never wait on disk I/O.
+    A batch is written when it reaches flush_size entries or flush_interval seconds.
+    """
+
+    def __init__(self, flush_size: int = LOG_FLUSH_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL_SECONDS):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, name: str, type: str, message: str) -> None:
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        self.queue.put((name, now, type, message))
+        if self._thread is None:
+            self._start()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def _run(self) -> None:
+        running = True
+        while running:
+            batch, taken = [], 0
+            entry = self.queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                taken += 1
+                if entry is None:
+                    running = False
+                    break
+                if entry is _FLUSH:
+                    break
+                batch.append(entry)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.flush_size or remaining <= 0:
+                    break
+                try:
+                    entry = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in range(taken):
+                self.queue.task_done()
+
+    def _write(self, batch: list) -> None:
+        if not batch:
+            return
+        try:
+            write_logs(batch)
+        except Exception as e:
+            print(f"Was not able to write {len(batch)} log entries due to {e}")
+
+    def flush(self) -> None:
+        """Block until every entry queued so far has been written"""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put(_FLUSH)
+            self.queue.join()
+        else:
+            batch = []
+            while True:
+                try:
+                    entry = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is not None and entry is not _FLUSH:
+                    batch.append(entry)
+                self.queue.task_done()
+            self._write(batch)
+
+    def shutdown(self) -> None:
+        """Write everything still queued and stop the background writer"""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join()
+        self.flush()
+
+
 class LogTracer(TracingProcessor):
 
+    def __init__(self, buffer: LogBuffer | None = None):
+        self.buffer = buffer or LogBuffer()
+
     def get_name(self, trace_or_span: Trace | Span) -> str | None:
         trace_id = trace_or_span.trace_id
         name = trace_id.split("_")[1]
@@ -28,12 +125,12 @@ class LogTracer(TracingProcessor):
     def on_trace_start(self, trace) -> None:
         name = self.get_name(trace)
         if name:
-            write_log(name, "trace", f"Started: {trace.name}")
+            self.buffer.put(name, "trace", f"Started: {trace.name}")
 
     def on_trace_end(self, trace) -> None:
         name = self.get_name(trace)
         if name:
-            write_log(name, "trace", f"Ended: {trace.name}")
+            self.buffer.put(name, "trace", f"Ended: {trace.name}")
 
     def on_span_start(self, span) -> None:
         name = self.get_name(span)
@@ -49,7 +146,7 @@ class LogTracer(TracingProcessor):
                     message += f" {span.span_data.server}"
             if span.error:
                 message += f" {span.error}"
-            write_log(name, type, message)
+            self.buffer.put(name, type, message)
 
     def on_span_end(self, span) -> None:
         name = self.get_name(span)
@@ -66,10 +163,10 @@ class LogTracer(TracingProcessor):
                     message += f" {span.span_data.server}"
             if span.error:
                 message += f" {span.error}"
-            write_log(name, type, message)
+            self.buffer.put(name, type, message)
 
     def force_flush(self) -> None:
-        pass
+        self.buffer.flush()
 
     def shutdown(self) -> None:
-        pass
\ No newline at end of file
+        self.buffer.shutdown()
\ No newline at end of file
@@ -1,9 +1,16 @@
 from traders import Trader
 from typing import List
 import asyncio
+from datetime import timedelta
 from tracers import LogTracer
+from mcp_pool import MCPServerPool
+from scheduler import TraderScheduler, CycleMetrics
+from providers import registry
+from accounts_client import client as accounts_client
 from agents import add_trace_processor
 from market import is_market_open
+from market_calendar import calendar
+from database import compact_logs, compact_portfolio_values
 from dotenv import load_dotenv
 import os
 
@@ -14,6 +21,12 @@ RUN_EVEN_WHEN_MARKET_IS_CLOSED = (
     os.getenv("RUN_EVEN_WHEN_MARKET_IS_CLOSED", "false").strip().lower() == "true"
 )
 USE_MANY_MODELS = os.getenv("USE_MANY_MODELS", "false").strip().lower() == "true"
+USE_MCP_SERVER_POOL = os.getenv("USE_MCP_SERVER_POOL", "true").strip().lower() == "true"
+MAX_CONCURRENT_TRADERS = int(os.getenv("MAX_CONCURRENT_TRADERS", "4"))
+TRADER_START_JITTER_SECONDS = float(os.getenv("TRADER_START_JITTER_SECONDS", "30"))
+TRADER_RUN_DEADLINE_MINUTES = float(
+    os.getenv("TRADER_RUN_DEADLINE_MINUTES", str(RUN_EVERY_N_MINUTES * 0.8))
+)
 
 names = ["Warren", "George", "Ray", "Cathie"]
 lastnames = ["Patience", "Bold", "Systematic", "Crypto"]
@@ -41,13 +54,50 @@ def create_traders() -> List[Trader]:
 async def run_every_n_minutes():
     add_trace_processor(LogTracer())
     traders = create_traders()
-    while True:
-        if RUN_EVEN_WHEN_MARKET_IS_CLOSED or is_market_open():
-            await asyncio.gather(*[trader.run() for trader in traders])
-        else:
-            print("Market is closed, skipping run")
-        await asyncio.sleep(RUN_EVERY_N_MINUTES * 60)
+    pool = MCPServerPool() if USE_MCP_SERVER_POOL else None
+    scheduler = TraderScheduler(
+        interval=RUN_EVERY_N_MINUTES * 60,
+        concurrency=MAX_CONCURRENT_TRADERS,
+        jitter=TRADER_START_JITTER_SECONDS,
+        deadline=TRADER_RUN_DEADLINE_MINUTES * 60,
+    )
+
+    async def before_cycle() -> bool:
+        if not (RUN_EVEN_WHEN_MARKET_IS_CLOSED or is_market_open()):
+            return False
+        if pool:
+            pool.start_cycle()
+            await pool.health_check()
+        return True
+
+    async def after_cycle(metrics: CycleMetrics | None):
+        if metrics:
+            print(metrics.report())
+            print(registry.report())
+            if pool:
+                print(pool.cycle_report())
+        await asyncio.to_thread(compact_logs)
+        await asyncio.to_thread(compact_portfolio_values)
+
+    async def wait_for_open():
+        seconds = calendar.seconds_until_open()
+        if seconds <= 0:
+            # The calendar says open but Polygon disagrees (an unscheduled closure): check again next tick
+            seconds = RUN_EVERY_N_MINUTES * 60
+        print(f"Market is closed, sleeping until {calendar.now() + timedelta(seconds=seconds):%Y-%m-%d %H:%M %Z}")
+        await asyncio.sleep(seconds)
 
+    try:
+        await scheduler.run_forever(
+            lambda: [(trader.name, lambda trader=trader: trader.run(pool)) for trader in traders],
+            before_cycle,
+            after_cycle,
+            wait_for_open,
+        )
+    finally:
+        await accounts_client.close()
+        if pool:
+            await pool.close()
 
 if __name__ == "__main__":
     print(f"Starting scheduler to run every {RUN_EVERY_N_MINUTES} minutes")